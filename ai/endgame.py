@@ -0,0 +1,196 @@
+import math
+import time
+
+from ai.gamestate import GameState
+from ai.transposition import TranspositionTable
+
+
+# Result of EndgameSolver.solve: outcome for the ai, plies until the game ends that way and the action to play, None
+# if all of the ai's tokens are boxed in and it has to skip its turn
+class EndgameResult:
+    WIN = 1
+    DRAW = 0
+    LOSS = -1
+
+    def __init__(self, outcome, distance, action):
+        self.outcome = outcome
+        self.distance = distance
+        self.action = action
+
+    # the score the normal search would give the result
+    @property
+    def score(self):
+        if self.outcome == EndgameResult.WIN:
+            return GameState.MAX_SCORE
+        if self.outcome == EndgameResult.LOSS:
+            return GameState.MIN_SCORE
+        return 0
+
+    def __str__(self):
+        if self.outcome == EndgameResult.DRAW:
+            return 'draw'
+        return f'{"win" if self.outcome == EndgameResult.WIN else "loss"} in {self.distance} plies'
+
+
+# Solves positions where both players are out of tokens. Only token moves are left, and moves_left goes down with each
+# of them, so the game always ends within moves_left plies and can be searched to the end for an exact result.
+# Scores are from the ai's side: a win at ply p is WIN_SCORE - p so quicker wins (and slower losses) score higher
+class EndgameSolver:
+    WIN_SCORE = GameState.MAX_SCORE
+
+    NODES_PER_TIME_CHECK = 256
+
+    # nodes a second the solver is assumed to visit until it has timed a solve of its own
+    DEFAULT_NODES_PER_SECOND = 5000
+    # a solve has to visit this many nodes for its speed to be measured, smaller ones are mostly overhead
+    MIN_NODES_TO_MEASURE = 1000
+
+    # the table is cleared once it holds this many positions
+    DEFAULT_TT_SIZE = 1 << 18
+
+    # deadline is a time.time() value. stop is a threading or multiprocessing Event, setting it stops the solve.
+    # nodes_per_second is the speed used to predict how long a solve takes, every solve that is big enough replaces
+    # it with the speed it measured
+    def __init__(self, deadline=None, stop=None, nodes_per_second=DEFAULT_NODES_PER_SECOND, tt_size=DEFAULT_TT_SIZE):
+        self.deadline = deadline
+        self.stop = stop
+        self.nodes_per_second = nodes_per_second
+        self.nodes = 0
+        # key -> (score relative to the position, bound, best action). Results don't depend on the depth, so they
+        # are kept from one solve to the next until the table is full
+        self._tt = {}
+        self._tt_size = tt_size
+        self._best_action = None
+
+    @staticmethod
+    def applies(state):
+        return state.moves_left > 0 and all(not player.has_tokens() for player in state.players)
+
+    # Best case alpha-beta tree size, b^ceil(d/2) + b^floor(d/2), with b from the actions both players have now
+    @staticmethod
+    def predicted_nodes(state):
+        ai_actions = len(state.get_all_possible_actions(0, True))
+        opp_actions = len(state.get_all_possible_actions(1, False))
+        branching = max(math.sqrt(ai_actions * opp_actions), 1)
+        depth = state.moves_left
+        return branching ** math.ceil(depth / 2) + branching ** (depth // 2)
+
+    def predicted_seconds(self, state):
+        return EndgameSolver.predicted_nodes(state) / self.nodes_per_second
+
+    # Raises SearchTimeoutError if the deadline passes first, or SearchCancelledError if stop is set. The state is
+    # left as it was given
+    def solve(self, state):
+        self._best_action = None
+        start = time.perf_counter()
+        start_nodes = self.nodes
+        score = self._search(state, 0, 0, -EndgameSolver.WIN_SCORE, EndgameSolver.WIN_SCORE)
+        nodes = self.nodes - start_nodes
+        if nodes >= EndgameSolver.MIN_NODES_TO_MEASURE:
+            self.nodes_per_second = nodes / (time.perf_counter() - start)
+        if score > 0:
+            return EndgameResult(EndgameResult.WIN, EndgameSolver.WIN_SCORE - score, self._best_action)
+        if score < 0:
+            return EndgameResult(EndgameResult.LOSS, EndgameSolver.WIN_SCORE + score, self._best_action)
+        return EndgameResult(EndgameResult.DRAW, state.moves_left, self._best_action)
+
+    def _visit_node(self):
+        # imported here since minimax imports this module
+        from ai.minimax import SearchCancelledError, SearchTimeoutError
+
+        self.nodes += 1
+        if self.nodes % EndgameSolver.NODES_PER_TIME_CHECK == 0:
+            if self.stop is not None and self.stop.is_set():
+                raise SearchCancelledError
+            if self.deadline is not None and time.time() >= self.deadline:
+                raise SearchTimeoutError
+
+    def _search(self, state, p_pos, ply, a, b):
+        self._visit_node()
+
+        game_over_score = state.game_over()
+        if game_over_score is not None:
+            if game_over_score == GameState.MAX_SCORE:
+                return EndgameSolver.WIN_SCORE - ply
+            if game_over_score == GameState.MIN_SCORE:
+                return -EndgameSolver.WIN_SCORE + ply
+            return 0
+
+        # no result from here can be better than winning with the next action, or worse than losing to it
+        best_possible = EndgameSolver.WIN_SCORE - ply - 1
+        if a >= best_possible:
+            return best_possible
+        if b <= -best_possible:
+            return -best_possible
+
+        key = state.zobrist_key(p_pos)
+        tt_action = None
+        entry = self._tt.get(key)
+        if entry is not None:
+            tt_score, tt_bound, tt_action = entry
+            score = from_tt_score(tt_score, ply)
+            if ply > 0 and (tt_bound == TranspositionTable.EXACT
+                            or (tt_bound == TranspositionTable.LOWER_BOUND and score >= b)
+                            or (tt_bound == TranspositionTable.UPPER_BOUND and score <= a)):
+                return score
+
+        is_ai = p_pos == 0
+        actions = state.get_all_possible_actions(p_pos, is_ai)
+        if not actions:
+            # a player whose tokens are all boxed in has to skip their turn, if both are the game can't go on
+            if not state.get_all_possible_actions(1 - p_pos, not is_ai):
+                return 0
+            return self._search(state, 1 - p_pos, ply, a, b)
+        if tt_action in actions:
+            actions.remove(tt_action)
+            actions.insert(0, tt_action)
+
+        original_a, original_b = a, b
+        best_score = -EndgameSolver.WIN_SCORE - 1 if is_ai else EndgameSolver.WIN_SCORE + 1
+        best_action = None
+        for action in actions:
+            state.apply(action, p_pos)
+            score = self._search(state, 1 - p_pos, ply + 1, a, b)
+            state.undo()
+
+            if (is_ai and score > best_score) or (not is_ai and score < best_score):
+                best_score = score
+                best_action = action
+            if is_ai:
+                a = max(a, best_score)
+            else:
+                b = min(b, best_score)
+            if a >= b:
+                break
+
+        if best_score <= original_a:
+            bound = TranspositionTable.UPPER_BOUND
+        elif best_score >= original_b:
+            bound = TranspositionTable.LOWER_BOUND
+        else:
+            bound = TranspositionTable.EXACT
+        if len(self._tt) >= self._tt_size:
+            self._tt.clear()
+        self._tt[key] = (to_tt_score(best_score, ply), bound, best_action)
+        # after the ai passes at the root, ply 0 is the opponents turn and their action isn't one the ai can play
+        if ply == 0 and is_ai:
+            self._best_action = best_action
+        return best_score
+
+
+# win and loss scores count plies from the root, the table stores them counted from the position itself so they
+# are still right when the position is reached at a different ply
+def to_tt_score(score, ply):
+    if score > 0:
+        return score + ply
+    if score < 0:
+        return score - ply
+    return 0
+
+
+def from_tt_score(score, ply):
+    if score > 0:
+        return score - ply
+    if score < 0:
+        return score + ply
+    return 0
@@ -0,0 +1,224 @@
+from board import Board, H_STRAT_CELLS
+
+# every X shape is a centre and its 4 diagonals, given as (x, y) offsets from the centre
+TOP_LEFT = (-1, 1)
+TOP_RIGHT = (1, 1)
+BOT_LEFT = (-1, -1)
+BOT_RIGHT = (1, -1)
+MIDDLE = (0, 0)
+
+# For a token in each spot of an X, the other spots in the order GameState.get_score_as_* evaluates them.
+# The order matters since evaluate_coords gives more points for each of the players tokens it has already seen
+X_ROLES = [
+    (MIDDLE, [TOP_LEFT, TOP_RIGHT, BOT_LEFT, BOT_RIGHT]),
+    (TOP_RIGHT, [TOP_LEFT, MIDDLE, BOT_LEFT, BOT_RIGHT]),
+    (TOP_LEFT, [BOT_RIGHT, MIDDLE, BOT_LEFT, TOP_RIGHT]),
+    (BOT_RIGHT, [TOP_LEFT, MIDDLE, BOT_LEFT, TOP_RIGHT]),
+    (BOT_LEFT, [TOP_LEFT, MIDDLE, BOT_RIGHT, TOP_RIGHT]),
+]
+
+# index tables of IncrementalEvaluator, made once per board size and shared by every evaluator of that size
+_EVALUATOR_TABLES_BY_SIZE = {}
+
+
+# For every cell of a padded board: the X centres and win strategy windows whose score depends on it, and for every
+# centre the spots to score. Only offsets and indices, nothing about where the tokens are
+class EvaluatorTables:
+    def __init__(self, width, height):
+        padding = IncrementalEvaluator.PADDING
+        self.width = width
+        self.height = height
+        self.stride = height + 2 * padding
+
+        # what a cell holds when there is no token in it, BORDER around the board so patterns near the edges don't
+        # need bounds checks
+        size = (width + 2 * padding) * self.stride
+        self.empty_cells = [IncrementalEvaluator.BORDER] * size
+        for x in range(1, width + 1):
+            for y in range(1, height + 1):
+                self.empty_cells[self.index(x, y)] = Board.OPEN_SPACE
+
+        roles = [(self._offset(*spot), [self._offset(*o) for o in others]) for spot, others in X_ROLES]
+        self.h_strat_cells = [self._offset(*c) for c in H_STRAT_CELLS]
+
+        # for each board cell: the X centres whose score depends on it, and the same for win strategy windows
+        self.centres_of_cell = {}
+        self.h_strat_origins_of_cell = {}
+        # for each centre: (spot, spots to evaluate in order) for the 5 spots a players token could be in
+        self.centre_roles = {}
+        for x in range(1, width + 1):
+            for y in range(1, height + 1):
+                i = self.index(x, y)
+                centres = [i - self._offset(*spot) for spot, _ in X_ROLES]
+                self.centres_of_cell[i] = centres
+                for c in centres:
+                    if c not in self.centre_roles:
+                        self.centre_roles[c] = [(c + spot, [c + o for o in others]) for spot, others in roles]
+
+                origins = []
+                for dx, dy in H_STRAT_CELLS:
+                    ox, oy = x - dx, y - dy
+                    if 1 <= ox <= width - 5 and 1 <= oy <= height - 3:
+                        origins.append(self.index(ox, oy))
+                self.h_strat_origins_of_cell[i] = origins
+
+    def index(self, x, y):
+        return (x - 1 + IncrementalEvaluator.PADDING) * self.stride + (y - 1 + IncrementalEvaluator.PADDING)
+
+    def _offset(self, dx, dy):
+        return dx * self.stride + dy
+
+    # pickled as just the board size, so a state sent to another process doesn't carry the tables with it
+    def __reduce__(self):
+        return get_evaluator_tables, (self.width, self.height)
+
+
+def get_evaluator_tables(width, height):
+    tables = _EVALUATOR_TABLES_BY_SIZE.get((width, height))
+    if tables is None:
+        tables = EvaluatorTables(width, height)
+        _EVALUATOR_TABLES_BY_SIZE[(width, height)] = tables
+    return tables
+
+
+# Keeps GameState.get_heuristic_score up to date as tokens are added, moved and removed, instead of recomputing it
+# for every token at every leaf.
+# Each players possible_wins total is split up by the X centre each pattern belongs to. A cell can only be in the
+# X of 5 centres, so a change only rescores those centres and the few win strategy windows that contain the cell.
+# Only the cells with a token and the centres and windows with a score are stored, so making or copying an
+# evaluator takes time in the number of tokens, not the size of the board
+class IncrementalEvaluator:
+    # cells outside the board. X shapes around tokens on the edge reach 2 cells past it
+    BORDER = -1
+    PADDING = 2
+
+    def __init__(self, width, height, players=()):
+        self._tables = get_evaluator_tables(width, height)
+        # padded index -> player number of every token, any other cell is the tables empty_cells value
+        self._tokens = {}
+
+        # index 0 is unused so a players number can index its own scores. centre or window -> its score, only the
+        # ones that aren't 0
+        self._centre_scores = [None, {}, {}]
+        self._possible_wins = [0, 0, 0]
+        self._h_strat_scores = [None, {}, {}]
+        self._h_strat = [0, 0, 0]
+
+        for player in players:
+            for x, y in player.used_tokens:
+                self.set_cell(x, y, player.number)
+
+    # changes a cell and rescores every pattern it is part of. A move is a set_cell to clear and one to place
+    def set_cell(self, x, y, num):
+        tables = self._tables
+        i = tables.index(x, y)
+        if num == Board.OPEN_SPACE:
+            self._tokens.pop(i, None)
+        else:
+            self._tokens[i] = num
+
+        possible_wins = self._possible_wins
+        centre_scores = self._centre_scores
+        for c in tables.centres_of_cell[i]:
+            scores = self._score_centre(c)
+            for p in (1, 2):
+                possible_wins[p] += _rescore(centre_scores[p], c, scores[p])
+
+        h_strat = self._h_strat
+        h_strat_scores = self._h_strat_scores
+        for o in tables.h_strat_origins_of_cell[i]:
+            num, score = self._score_h_strat_window(o)
+            for p in (1, 2):
+                h_strat[p] += _rescore(h_strat_scores[p], o, score if p == num else 0)
+
+    # sum of GameState.possible_wins patterns that have their X centred on c, for both players at once since only
+    # the spots holding a token give a pattern. Indexed by player number like _possible_wins
+    def _score_centre(self, c):
+        tokens = self._tokens
+        empty_cells = self._tables.empty_cells
+        totals = [0, 0, 0]
+        for spot, others in self._tables.centre_roles[c]:
+            num = tokens.get(spot)
+            if num is None:
+                continue
+            # same scoring as GameState.evaluate_coords
+            score = 0
+            i = 20
+            j = 15
+            for o in others:
+                value = tokens.get(o)
+                if value is None:
+                    if empty_cells[o] == IncrementalEvaluator.BORDER:
+                        score -= 4
+                    else:
+                        score += i
+                elif value == num:
+                    score += i
+                    i += i
+                else:
+                    score -= j
+                    j *= j
+            totals[num] += score
+        return totals
+
+    # (player, score) of one window of Board.found_h_win_strat. Only the player with a token in the middle of the
+    # window can score it
+    def _score_h_strat_window(self, o):
+        tokens = self._tokens
+        left, mid, right, inner_left, inner_right, top = self._tables.h_strat_cells
+        num = tokens.get(o + mid)
+        if num is None:
+            return None, 0
+        left = tokens.get(o + left) == num
+        right = tokens.get(o + right) == num
+        if left and right:
+            score = 5000
+            inner_left = tokens.get(o + inner_left) == num
+            inner_right = tokens.get(o + inner_right) == num
+            if inner_left and inner_right:
+                score += 20000
+                if tokens.get(o + top) == num:
+                    score += 999999
+            elif inner_left or inner_right:
+                score += 80000
+            return num, score
+        if left or right:
+            return num, 1000
+        return num, 0
+
+    def possible_wins(self, num):
+        return self._possible_wins[num]
+
+    def h_win_strat(self, num):
+        return self._h_strat[num]
+
+    # same result as GameState.compute_heuristic_score, without looking at a single token
+    def heuristic_score(self, ai, opp):
+        num_ai_tokens = len(ai.used_tokens)
+        max_score = num_ai_tokens + self._possible_wins[ai.number]
+        if ai.tokens_left <= 8:
+            max_score -= 20 * num_ai_tokens * num_ai_tokens
+        max_score += self._h_strat[ai.number] * 300
+
+        min_score = len(opp.used_tokens) + self._possible_wins[opp.number]
+        return max_score - min_score
+
+    def copy(self):
+        evaluator = IncrementalEvaluator.__new__(IncrementalEvaluator)
+        evaluator._tables = self._tables
+        evaluator._tokens = self._tokens.copy()
+        evaluator._centre_scores = [None] + [scores.copy() for scores in self._centre_scores[1:]]
+        evaluator._possible_wins = self._possible_wins.copy()
+        evaluator._h_strat_scores = [None] + [scores.copy() for scores in self._h_strat_scores[1:]]
+        evaluator._h_strat = self._h_strat.copy()
+        return evaluator
+
+
+# stores a new score for key in scores, which only keeps scores that aren't 0, and returns how much it changed
+def _rescore(scores, key, score):
+    old_score = scores.get(key, 0)
+    if score:
+        scores[key] = score
+    elif old_score:
+        del scores[key]
+    return score - old_score
@@ -0,0 +1,94 @@
+# the add action and on board diagonals of every square, made once per board size
+_FRONTIER_TABLES_BY_SIZE = {}
+
+
+class FrontierTables:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        size = width * height
+
+        # the add action for each square, made once so reads never build tuples
+        self.actions = [None] * size
+        # the squares diagonal to each square that are on the board
+        self.diagonals = [None] * size
+        for x in range(1, width + 1):
+            for y in range(1, height + 1):
+                i = self.index(x, y)
+                self.actions[i] = (x, y, None, None)
+                self.diagonals[i] = [self.index(x + dx, y + dy) for dx, dy in AddFrontier.DIAGONALS
+                                     if 1 <= x + dx <= width and 1 <= y + dy <= height]
+
+    def index(self, x, y):
+        return (x - 1) * self.height + (y - 1)
+
+    # pickled as just the board size, like EvaluatorTables
+    def __reduce__(self):
+        return get_frontier_tables, (self.width, self.height)
+
+
+def get_frontier_tables(width, height):
+    tables = _FRONTIER_TABLES_BY_SIZE.get((width, height))
+    if tables is None:
+        tables = FrontierTables(width, height)
+        _FRONTIER_TABLES_BY_SIZE[(width, height)] = tables
+    return tables
+
+
+# Keeps the add actions GameState.get_adds_in_token_diags_first gives: every empty square diagonal to a token.
+# Each square counts how many tokens are diagonal to it, so adding, moving or removing a token only has to look at
+# its 4 diagonals instead of rebuilding the set from every token. Only squares with a token or a count are stored
+class AddFrontier:
+    DIAGONALS = [(-1, 1), (1, 1), (-1, -1), (1, -1)]
+
+    def __init__(self, width, height, players=()):
+        self._tables = get_frontier_tables(width, height)
+        self._occupied = set()
+        # square -> tokens diagonal to it, only squares that have some
+        self._diagonal_tokens = {}
+
+        # a dict is used as an ordered set, so the actions come out in the same order every time
+        self._frontier = {}
+        for player in players:
+            for x, y in player.used_tokens:
+                self.add_token(x, y)
+
+    def add_token(self, x, y):
+        i = self._tables.index(x, y)
+        actions = self._tables.actions
+        self._occupied.add(i)
+        self._frontier.pop(actions[i], None)
+
+        diagonal_tokens = self._diagonal_tokens
+        for d in self._tables.diagonals[i]:
+            count = diagonal_tokens.get(d, 0) + 1
+            diagonal_tokens[d] = count
+            if count == 1 and d not in self._occupied:
+                self._frontier[actions[d]] = None
+
+    def remove_token(self, x, y):
+        i = self._tables.index(x, y)
+        actions = self._tables.actions
+        self._occupied.discard(i)
+        if i in self._diagonal_tokens:
+            self._frontier[actions[i]] = None
+
+        diagonal_tokens = self._diagonal_tokens
+        for d in self._tables.diagonals[i]:
+            count = diagonal_tokens[d] - 1
+            if count == 0:
+                del diagonal_tokens[d]
+                self._frontier.pop(actions[d], None)
+            else:
+                diagonal_tokens[d] = count
+
+    def actions(self):
+        return list(self._frontier)
+
+    def copy(self):
+        frontier = AddFrontier.__new__(AddFrontier)
+        frontier._tables = self._tables
+        frontier._occupied = self._occupied.copy()
+        frontier._diagonal_tokens = self._diagonal_tokens.copy()
+        frontier._frontier = self._frontier.copy()
+        return frontier
@@ -1,7 +1,25 @@
 import numpy as np
 import random
+from itertools import chain
 
+from ai.evaluation import IncrementalEvaluator
+from ai.frontier import AddFrontier
+from ai.wins import WinTracker
 from board import Board
+from zobrist import get_zobrist_keys
+
+
+# What GameState caches for game_over before it has been worked out. Pickled by name, so a state sent to another
+# process still compares it with is
+class _NotComputed:
+    def __reduce__(self):
+        return 'NOT_COMPUTED'
+
+    def __repr__(self):
+        return 'NOT_COMPUTED'
+
+
+NOT_COMPUTED = _NotComputed()
 
 
 class GameState:
@@ -10,10 +28,30 @@ class GameState:
     MAX_SCORE = 99999999999999
     MIN_SCORE = -99999999999999
 
-    def __init__(self, board, moves_left, players):
+    NOT_COMPUTED = NOT_COMPUTED
+
+    # tracked is a state of the same position whose evaluator, add frontier and win tracker are copied instead of
+    # being built up from every token
+    def __init__(self, board, moves_left, players, tracked=None):
         self.board = board
         self.moves_left = moves_left
         self.players = players
+        # (action, p_pos) for every applied action
+        self._undo_stack = []
+        self._keys = get_zobrist_keys(board.width, board.height)
+        if tracked is not None:
+            self.evaluator = tracked.evaluator.copy()
+            self.add_frontier = tracked.add_frontier.copy()
+            self.wins = tracked.wins.copy()
+        else:
+            # kept up to date by every add, move and undo so leaves don't have to recompute the heuristic
+            self.evaluator = IncrementalEvaluator(board.width, board.height, players)
+            # the squares worth adding a token to, also kept up to date instead of rebuilt at every node
+            self.add_frontier = AddFrontier(board.width, board.height, players)
+            # the winning X shapes, so game_over only has to look at the cells that changed
+            self.wins = WinTracker(board.width, board.height, players)
+        # result of game_over for the current position, NOT_COMPUTED after any change
+        self._game_over = GameState.NOT_COMPUTED
 
     @property
     def ai(self):
@@ -23,13 +61,28 @@ class GameState:
     def opp(self):
         return self.players[1]
 
+    # hash of the whole position with players[p_pos] to move: the board, moves left and both players tokens left.
+    # Scores are stored from the ai's point of view, so which player the ai is is part of the key too, or a table used
+    # for both players would give one the other's scores
+    def zobrist_key(self, p_pos):
+        key = self.board.zobrist_key ^ self._keys.moves_left(self.moves_left)
+        for player in self.players:
+            key ^= self._keys.tokens_left(player.number, player.tokens_left)
+        key ^= self._keys.ai(self.ai.number)
+        return key ^ self._keys.side_to_move(self.players[p_pos].number)
+
     def get_all_possible_actions(self, p_pos, is_ai):
         actions = []
 
-        # if first move, just put token in center
+        # if first move, just put token in center, or half way to the left edge if the centre is taken. On a board 3
+        # wide the centre column is 2, so half way is still a different square. If that is taken too, any empty square
         if not self.ai.used_tokens:
-            base = [(6, 5, None, None)] if not self.out_of_bounds_or_occupied(6, 5) else [(3, 5, None, None)]
-            return base
+            x, y = (self.board.width + 1) // 2, (self.board.height + 1) // 2
+            if self.out_of_bounds_or_occupied(x, y):
+                x = (x + 1) // 2
+            if self.out_of_bounds_or_occupied(x, y):
+                return self.get_all_possible_adds()
+            return [(x, y, None, None)]
 
         # get possible add to boards (where board is empty)
         if self.players[p_pos].tokens_left > 0 and self.moves_left > 0:
@@ -44,18 +97,25 @@ class GameState:
                 # actions.extend(self.get_all_possible_moves(x, y))
                 actions = self.get_all_possible_moves(x, y) + actions
 
+        # a small or crowded board can leave no empty square diagonal to a token, then any empty square will do
+        if not actions and self.players[p_pos].tokens_left > 0 and self.moves_left > 0:
+            actions = self.get_all_possible_adds()
+
         return actions
 
+    # both players tokens, iterated without building a new list
+    def all_tokens(self):
+        return chain(self.ai.used_tokens, self.opp.used_tokens)
+
     def get_all_possible_adds(self):
         empty_spaces = np.where(self.board.np_board == 0)
         empty_coords = list(zip(*empty_spaces))
-        empty_coords = [(c[0] + 1, c[1] + 1, None, None) for c in empty_coords if True]
+        empty_coords = [(int(c[0]) + 1, int(c[1]) + 1, None, None) for c in empty_coords if True]
         return empty_coords
 
     def get_adds_in_token_radius(self, radius):
         coords = set()
-        used_tokens = self.ai.used_tokens + self.opp.used_tokens
-        for c in used_tokens:
+        for c in self.all_tokens():
             for x in range(c[0] - radius, c[0] + radius + 1):
                 for y in range(c[1] - radius, c[1] + radius + 1):
                     if not self.out_of_bounds_or_occupied(x, y) and not self.board.token_is_lonely(x, y):
@@ -63,9 +123,12 @@ class GameState:
         return coords
 
     def get_adds_in_token_diags_first(self):
+        return self.add_frontier.actions()
+
+    # rebuilds get_adds_in_token_diags_first from every token, add_frontier keeps the same squares
+    def compute_adds_in_token_diags(self):
         coords = set()
-        used_tokens = self.ai.used_tokens + self.opp.used_tokens
-        for c in used_tokens:
+        for c in self.all_tokens():
             x = c[0]
             y = c[1]
             lef = x - 1
@@ -83,7 +146,9 @@ class GameState:
         moves = [(x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1), (x - 1, y + 1), (x + 1, y + 1), (x - 1, y - 1),
                  (x + 1, y - 1)]
 
-        possible_moves = [(x, y, m[0], m[1]) for m in moves if not self.out_of_bounds_or_occupied(m[0], m[1])]
+        # cells off the board are BORDER, so this also leaves out moves off the board
+        get_cell = self.board.get_cell
+        possible_moves = [(x, y, m[0], m[1]) for m in moves if get_cell(m[0], m[1]) == Board.OPEN_SPACE]
         return possible_moves
 
     def out_of_bounds_or_occupied(self, x, y):
@@ -94,7 +159,7 @@ class GameState:
             return self.board.coordinate_already_occupied(x, y)
 
     def copy(self):
-        return GameState(self.board.copy(), self.moves_left, (self.ai.copy(), self.opp.copy()))
+        return GameState(self.board.copy(), self.moves_left, (self.ai.copy(), self.opp.copy()), tracked=self)
 
     def new_state_from_action(self, action, p_pos):
         x1, y1, x2, y2 = action
@@ -109,10 +174,50 @@ class GameState:
 
         return new_state
 
+    # applies the action to this state in place, undo() reverts it exactly
+    def apply(self, action, p_pos):
+        x1, y1, x2, y2 = action
+        # ADD
+        if x2 is None and y2 is None:
+            self.add_token_at(p_pos, x1, y1)
+        # MOVE
+        else:
+            self.move_token(p_pos, x1, y1, x2, y2)
+        self._undo_stack.append((action, p_pos))
+
+    # reverts the last applied action: board cells, token counts, used_tokens order and moves left
+    def undo(self):
+        (x1, y1, x2, y2), p_pos = self._undo_stack.pop()
+        player = self.players[p_pos]
+        # ADD
+        if x2 is None and y2 is None:
+            self.board.set_player_num_in_coord(x1, y1, Board.OPEN_SPACE)
+            self.track_cell(x1, y1, Board.OPEN_SPACE)
+            player.return_token()
+        # MOVE
+        else:
+            self.board.set_player_num_in_coord(x2, y2, Board.OPEN_SPACE)
+            self.board.set_player_num_in_coord(x1, y1, player.number)
+            self.track_cell(x2, y2, Board.OPEN_SPACE)
+            self.track_cell(x1, y1, player.number)
+            player.undo_moved_token(x1, y1, x2, y2)
+            self.moves_left += 1
+
+    # updates everything kept alongside the board after one of its cells changed
+    def track_cell(self, x, y, num):
+        self._game_over = GameState.NOT_COMPUTED
+        self.evaluator.set_cell(x, y, num)
+        self.wins.set_cell(x, y, num)
+        if num == Board.OPEN_SPACE:
+            self.add_frontier.remove_token(x, y)
+        else:
+            self.add_frontier.add_token(x, y)
+
     def add_token_at(self, p_pos, x, y):
         # place token on board and reduce token count
         player = self.players[p_pos]
         self.board.add_token_to_board(player, x, y)
+        self.track_cell(x, y, player.number)
 
         #  TODO: disable checks
         # self.board.np_board[x - 1][y - 1] = player.number
@@ -122,6 +227,8 @@ class GameState:
         # open the original position and take new position
         player = self.players[p_pos]
         self.board.move_token_on_board(player, x1, y1, x2, y2)
+        self.track_cell(x1, y1, Board.OPEN_SPACE)
+        self.track_cell(x2, y2, player.number)
 
         # self.board.np_board[x1 - 1][y1 - 1] = Board.OPEN_SPACE
         # self.board.np_board[x2 - 1][y2 - 1] = player.number
@@ -129,11 +236,31 @@ class GameState:
         # muse update max moves in game
         self.moves_left -= 1
 
+    # MAX_SCORE if the ai won, MIN_SCORE if the opponent did, 0 for a draw or None if the game keeps going
     def game_over(self):
+        if self._game_over is GameState.NOT_COMPUTED:
+            if self.wins.has_won(self.ai.number):
+                self._game_over = GameState.MAX_SCORE
+            elif self.wins.has_won(self.opp.number):
+                self._game_over = GameState.MIN_SCORE
+            elif self.is_draw():
+                self._game_over = 0
+            else:
+                self._game_over = None
+        return self._game_over
+
+    # Nobody can do anything: both players are out of tokens and moves, or every square has a token so no token can
+    # be added or moved. XRudderGame ends the game as a draw in both cases
+    def is_draw(self):
+        if len(self.ai.used_tokens) + len(self.opp.used_tokens) == self.board.width * self.board.height:
+            return True
+        return all(not player.has_tokens() for player in self.players) and self.moves_left == 0
+
+    # same as game_over, but checks every token on the board instead of using the win tracker
+    def compute_game_over(self):
         winner_set = set()
         # winner_set = self.board.check_if_someone_won()
-        used_tokens = self.ai.used_tokens + self.opp.used_tokens
-        winner_set = self.board.check_if_someone_won_using_tokens(used_tokens)
+        winner_set = self.board.check_if_someone_won_using_tokens(self.all_tokens())
         # for player in self.players:
         #     is_win = any(self.is_win_coord(token_coord) for token_coord in player.used_tokens)
         #     if is_win:
@@ -146,13 +273,17 @@ class GameState:
             else:
                 return GameState.MIN_SCORE
         # check draw
-        elif all(not player.has_tokens() for player in self.players) and self.moves_left == 0:
+        elif self.is_draw():
             return 0
         # game keeps going
         else:
             return None
 
     def get_heuristic_score(self):
+        return self.evaluator.heuristic_score(self.ai, self.opp)
+
+    # recomputes the heuristic from every token, get_heuristic_score gives the same result without doing this
+    def compute_heuristic_score(self):
         max_score = 0
         for token_coords in self.ai.used_tokens:
             max_score += 1
@@ -230,19 +361,18 @@ class GameState:
         score = 0
         i = 20
         j = 15
+        get_cell = self.board.get_cell
         for coor in coords:
-            a = coor[0]
-            b = coor[1]
+            num = get_cell(coor[0], coor[1])
 
-            if self.board.coordinates_not_in_bounds(a, b):
+            if num == Board.BORDER:
                 score -= 4
-            elif self.board.coordinate_already_occupied(a, b):
-                if self.board.is_players_token(player, a, b):
-                    score += i
-                    i += i
-                else:
-                    score -= j
-                    j *= j
+            elif num == player.number:
+                score += i
+                i += i
+            elif num != Board.OPEN_SPACE:
+                score -= j
+                j *= j
             # empty space
             else:
                 score += i
@@ -1,101 +1,411 @@
+import time
+
+from ai.endgame import EndgameSolver
 from ai.gamestate import GameState
+from ai.parallel import get_root_split_search
+from ai.searchstats import TimedGameState
+from ai.transposition import TranspositionTable
 
 
-def get_move(state, depth):
-    root_minimax = MiniMax(state, True, depth)
-    root_minimax_with_result = root_minimax.run()
-    print(f'found score of {root_minimax_with_result.score}')
+# Searches depth 1, 2, 3... up to max_depth. If the context has a deadline, the search stops once it passes and the
+# action of the last fully searched depth is used. Depth 1 is always finished so there is an action, unless the
+# contexts stop event is set before then, which raises SearchCancelledError. Returns None if the ai has no action.
+# With more than 1 worker the root actions are split over that many processes, see RootSplitSearch
+def get_move(state, max_depth, context=None, workers=1):
+    if context is None:
+        context = SearchContext()
+    stats = context.stats
+    start = time.perf_counter()
 
-    next_action = root_minimax_with_result.next_best_node.action
-    return next_action
+    book_action = context.book_action(state)
+    if book_action is not None:
+        context.pv = [book_action]
+        if stats is not None:
+            stats.pv = [book_action]
+            stats.time = time.perf_counter() - start
+        return book_action
 
+    endgame_result = solve_endgame(state, context)
+    if endgame_result is not None:
+        context.score = endgame_result.score
+        context.depth = endgame_result.distance
+        context.pv = [endgame_result.action]
+        if stats is not None:
+            stats.score = context.score
+            stats.pv = [endgame_result.action]
+            stats.time = time.perf_counter() - start
+        return endgame_result.action
 
-class MiniMax:
-    is_ai: bool
-    state: GameState
-    DEFAULT_DEPTH = 3
+    # all of the ai's tokens are boxed in, it has to skip its turn
+    if not state.get_all_possible_actions(0, True):
+        context.pv = []
+        if stats is not None:
+            stats.time = time.perf_counter() - start
+        return None
 
-    def __init__(self, state: GameState, is_ai, depth=DEFAULT_DEPTH, action=None, a=GameState.MIN_SCORE,
-                 b=GameState.MAX_SCORE):
-        self.state = state
-        self.is_ai = is_ai
+    if workers > 1:
+        action, context.score = get_root_split_search(workers).get_move(state.copy(), max_depth, context.deadline)
+        context.pv = [action]
+        if stats is not None:
+            # the workers don't report their stats, only the result is known
+            stats.score = context.score
+            stats.pv = [action]
+            stats.time = time.perf_counter() - start
+        return action
+
+    # the search applies and undoes actions on a single state, so work on a copy of the callers state
+    state = state.copy()
+    if stats is not None:
+        state = TimedGameState(state, stats)
+
+    search = NegamaxSearch(state, context)
+    result = None
+    for depth in range(1, max_depth + 1):
+        context.can_time_out = result is not None
+        depth_start = time.perf_counter()
+        nodes = context.nodes
+        try:
+            score = search.search_root(depth, result[0] if result is not None else None)
+        except SearchTimeoutError:
+            if stats is not None:
+                stats.record_depth(depth, context.nodes - nodes, time.perf_counter() - depth_start, completed=False)
+            # only a stop can end depth 1, there is no action to give
+            if result is None:
+                raise
+            # the unfinished depth is thrown away, its best actions are still in the tt
+            break
+        result = (score, depth, search.pv)
+        if stats is not None:
+            stats.record_depth(depth, context.nodes - nodes, time.perf_counter() - depth_start, score, search.pv)
+
+        # a forced win or loss was found, searching deeper won't change it
+        if score in (GameState.MAX_SCORE, GameState.MIN_SCORE):
+            break
+        if context.past_deadline():
+            break
+
+    context.score, context.depth, context.pv = result
+    if stats is not None:
+        stats.score = context.score
+        stats.pv = context.pv
+        stats.time = time.perf_counter() - start
+
+    return context.pv[0]
+
+
+# Solves the position exactly with the contexts EndgameSolver if both players are out of tokens and the solver is
+# predicted to finish in half the time left. Returns None if it doesn't apply or ran out of time, the other half of
+# the time is then still there for the normal search. The contexts stop event stops the solve too, and raises
+# SearchCancelledError like it would in the normal search.
+# A context with no deadline but a stop event, like a ponder search, solves for as long as it takes. A deadline given
+# to it later by Ponderer.ponder_hit is passed on to the solver
+def solve_endgame(state, context):
+    solver = context.endgame
+    if solver is None or not EndgameSolver.applies(state):
+        return None
+
+    if context.deadline is not None:
+        if solver.predicted_seconds(state) > (context.deadline - time.time()) / 2:
+            return None
+        solver.deadline = endgame_deadline(context.deadline)
+    elif context.stop is not None:
+        solver.deadline = None
+        # ponder_hit sets the contexts deadline before the solvers, one it set since the check above is seen here
+        if context.deadline is not None:
+            solver.deadline = endgame_deadline(context.deadline)
+    else:
+        return None
+    solver.stop = context.stop
+    try:
+        result = solver.solve(state.copy())
+    except SearchCancelledError:
+        raise
+    except SearchTimeoutError:
+        return None
+    if result.action is None:
+        return None
+    context.endgame_result = result
+    return result
+
+
+# the endgame solver gets half the time left until deadline
+def endgame_deadline(deadline):
+    return time.time() + (deadline - time.time()) / 2
+
+
+# raised inside the search to stop it once the deadline has passed
+class SearchTimeoutError(Exception):
+    pass
+
+
+# raised inside the search when the contexts stop event is set
+class SearchCancelledError(SearchTimeoutError):
+    pass
+
+
+# Everything shared by all nodes of a search
+class SearchContext:
+    # only look at the clock every so many nodes, it is slower than visiting a node
+    NODES_PER_TIME_CHECK = 256
+
+    # actions that caused a cutoff are remembered in this many slots per ply
+    KILLER_SLOTS = 2
+
+    # deadline is a time.time() value. A SearchStats given as stats is filled in with what the search did.
+    # Positions in the OpeningBook given as book are not searched. Endgames are solved with the EndgameSolver given
+    # as endgame when it should finish in time, see solve_endgame.
+    # pvs and aspiration turn on principal variation search and aspiration windows, see NegamaxSearch.
+    # stop is a threading or multiprocessing Event, setting it stops the search like the deadline passing would
+    def __init__(self, tt=None, deadline=None, order_moves=True, stats=None, book=None,
+                 endgame=None, pvs=True, aspiration=True, stop=None):
+        self.stats = stats
+        self.stop = stop
+        self.pvs = pvs
+        self.aspiration = aspiration
+        self.book = book
+        self.endgame = endgame
+        self.tt = tt if tt is not None else TranspositionTable()
+        self.tt.new_search()
+        self.deadline = deadline
+        self.can_time_out = False
+        self.nodes = 0
+
+        # results of get_move: score of the chosen action, the deepest depth fully searched and the principal
+        # variation starting with the chosen action, only the action itself if the move wasn't searched
+        self.score = None
+        self.depth = None
+        self.pv = []
+        self.from_book = False
+        self.endgame_result = None
+
+        # move ordering tables, they are kept for every depth of an iterative deepening search
+        self.order_moves = order_moves
+        # ply -> most recent actions that caused a cutoff at that ply
+        self.killers = {}
+        # one table per player position: action -> how much it has caused cutoffs, deeper cutoffs count more
+        self.history = ({}, {})
+
+    # starts with the move ordering tables of an earlier search of a nearby position, like a stopped ponder search
+    def reuse_ordering(self, context):
+        self.killers = context.killers
+        self.history = context.history
+
+    # the books action for the state with the ai to move, or None if it isn't in the book
+    def book_action(self, state):
+        if self.book is None:
+            return None
+        entry = self.book.probe(state.zobrist_key(0))
+        if entry is None:
+            return None
+        action, depth = entry
+        # a different position with the same key would give an action that may not even be possible here
+        if action not in state.get_all_possible_actions(0, True):
+            return None
         self.depth = depth
-        self.action = action
-        self.a = a
-        self.b = b
-
-        self.actions = []
-        self.p_pos = 0 if is_ai else 1
-        # Start with worst possible score
-        self.score = GameState.MIN_SCORE if is_ai else GameState.MAX_SCORE
-        self.next_best_node = None
-
-    @property
-    def players(self):
-        return self.state.players
-
-    def gen_child(self, action, a, b):
-        next_possible_state = self.state.new_state_from_action(action, self.p_pos)
-        return MiniMax(next_possible_state, not self.is_ai, self.depth - 1, action, a, b)
-
-    # def gen_children(self, a, b):
-    #     self.actions = self.state.get_all_possible_actions(self.p_pos, self.is_ai)
-    #     for action in self.actions:
-    #         next_possible_state = self.state.new_state_from_action(action, self.p_pos)
-    #         self.children.append(MiniMax(next_possible_state, not self.is_ai, self.depth - 1, action, a, b))
-
-    def run(self):
+        self.from_book = True
+        return action
+
+    def past_deadline(self):
+        return self.deadline is not None and time.time() >= self.deadline
+
+    # counts the node and stops the search if it is out of time or was told to stop
+    def visit_node(self):
+        self.nodes += 1
+        if self.nodes % SearchContext.NODES_PER_TIME_CHECK == 0:
+            if self.stop is not None and self.stop.is_set():
+                raise SearchCancelledError
+            if self.can_time_out and self.past_deadline():
+                raise SearchTimeoutError
+
+    # tt action first, then this plies killer actions, then the rest by their history score
+    def order_actions(self, actions, p_pos, ply, tt_action):
+        if self.order_moves:
+            history = self.history[p_pos]
+            # sort is stable so actions with equal history keep the order they were generated in
+            actions.sort(key=lambda action: history.get(action, 0), reverse=True)
+            for killer in reversed(self.killers.get(ply, [])):
+                if killer in actions:
+                    actions.remove(killer)
+                    actions.insert(0, killer)
+
+        # the best action found last time is the most likely to cause a cutoff
+        if tt_action is not None and tt_action in actions:
+            actions.remove(tt_action)
+            actions.insert(0, tt_action)
+
+    def record_cutoff(self, action, p_pos, ply, depth):
+        if self.stats is not None:
+            self.stats.record_cutoff(ply)
+        if not self.order_moves:
+            return
+
+        killers = self.killers.setdefault(ply, [])
+        if action not in killers:
+            killers.insert(0, action)
+            del killers[SearchContext.KILLER_SLOTS:]
+        history = self.history[p_pos]
+        history[action] = history.get(action, 0) + depth * depth
+
+
+# The search get_move runs: alpha-beta as a single recursive negamax function, so a node is only a stack frame.
+# Scores inside are from the side to move's point of view, search() takes and returns them from the ai's.
+# It gives the same scores and actions as the MiniMax node objects it replaced, which benchmarks/search_memory.py
+# keeps: same move ordering, tt entries (stored from the ai's point of view) and root tie-break. The best line is kept
+# in a triangular pv table: row ply holds the line from that ply on.
+# With context.pvs, only the first child of a node is searched with the full window. The rest get a null window that
+# just tells if they beat the best so far, and only the ones that do are searched again with the full window
+class NegamaxSearch:
+    # an aspiration window is the last depth's score +- the size of that score plus this much. Heuristic scores jump
+    # by several times between depths, narrower windows failed and had to be searched again too often
+    ASPIRATION_WINDOW = 1000
+
+    def __init__(self, state, context=None):
+        self.state = state
+        self.context = context if context is not None else SearchContext()
+        # grown by search() to fit the deepest ply it can reach
+        self._pv_table = []
+        self._pv_length = []
+        # only for the root: action -> its position in the order the actions were generated
+        self._generation_index = None
+        self.pv = []
+
+    # Searches players[p_pos] to move with the window (a, b), both from the ai's point of view, and returns the score
+    # from the ai's point of view. ply 0 is the root, its best line is left in pv
+    def search(self, p_pos, depth, ply=0, a=GameState.MIN_SCORE, b=GameState.MAX_SCORE):
+        self._fit_pv_table(ply + depth + 1)
+        sign = 1 if p_pos == 0 else -1
+        if sign == 1:
+            score = self._negamax(p_pos, depth, ply, a, b)
+        else:
+            score = self._negamax(p_pos, depth, ply, -b, -a)
+        self.pv = self._pv_table[ply][:self._pv_length[ply] - ply]
+        return sign * score
+
+    # With context.aspiration, a depth is first searched with a small window around the score of the last depth,
+    # which cuts off more. If the score falls outside of it, that depth is searched again with the full window
+    def search_root(self, depth, last_score=None):
+        if not self.context.aspiration or last_score is None \
+                or last_score in (GameState.MIN_SCORE, GameState.MAX_SCORE):
+            return self.search(0, depth)
+
+        delta = NegamaxSearch.ASPIRATION_WINDOW + abs(last_score)
+        a, b = last_score - delta, last_score + delta
+        score = self.search(0, depth, 0, a, b)
+        if score <= a or score >= b:
+            score = self.search(0, depth)
+        return score
+
+    def _negamax(self, p_pos, depth, ply, a, b):
+        context = self.context
+        state = self.state
+        context.visit_node()
+        self._pv_length[ply] = ply
+        sign = 1 if p_pos == 0 else -1
+
         # FIRST HANDLE BASE CASES
-        # check for game end due to win or draw
-        game_over_score = self.state.game_over()
+        game_over_score = state.game_over()
         if game_over_score is not None:
-            self.score = game_over_score
-            return self
+            return sign * game_over_score
+        if depth == 0:
+            return sign * state.get_heuristic_score()
 
-        # if got to the max depth we wanted, also stop and apply heuristic
-        if self.depth == 0:
-            self.score = self.state.get_heuristic_score()
-            return self
+        # the tt is shared with other searches, so its scores and windows are from the ai's point of view
+        a_ai, b_ai = (a, b) if sign == 1 else (-b, -a)
+        key = state.zobrist_key(p_pos)
+        tt_action = None
+        entry = context.tt.probe(key)
+        if entry is not None:
+            tt_depth, tt_score, tt_bound, tt_action = entry
+            # the root always searches, it has to pick an action
+            if tt_depth >= depth and ply > 0 and tt_score_is_usable(tt_score, tt_bound, a_ai, b_ai):
+                return sign * tt_score
 
-        # ELSE CONTINUE WITH CHECKING NEXT MOVES
-        # generate all possible next states
-        self.actions = self.state.get_all_possible_actions(self.p_pos, self.is_ai)
+        is_root = ply == 0
+        actions = state.get_all_possible_actions(p_pos, p_pos == 0)
+        if is_root:
+            self._generation_index = {action: k for k, action in enumerate(actions)}
+        context.order_actions(actions, p_pos, ply, tt_action)
 
-        if self.is_ai:
-            return self.maximize()
-        else:
-            return self.minimize()
-
-    def maximize(self):
-        n: MiniMax
-        for action in self.actions:
-            n = self.gen_child(action, self.a, self.b)
-            n_with_score = n.run()
-
-            if self.next_best_node is None:
-                self.next_best_node = n_with_score
-
-            if n_with_score.score > self.score:
-                self.score = n_with_score.score
-                self.next_best_node = n_with_score
-            self.a = self.score
-            if self.a >= self.b:
-                return self
-        return self
-
-    def minimize(self):
-        n: MiniMax
-        for action in self.actions:
-            n = self.gen_child(action, self.a, self.b)
-            n_with_score = n.run()
-
-            if self.next_best_node is None:
-                self.next_best_node = n_with_score
-
-            if n_with_score.score < self.score:
-                self.score = n_with_score.score
-                self.next_best_node = n_with_score
-            self.b = self.score
-            if self.a >= self.b:
-                return self
-        return self
+        best_score = GameState.MIN_SCORE
+        best_action = None
+        for action in actions:
+            child_a = a
+            if is_root:
+                child_a = self._root_child_alpha(action, best_action, a, b)
+                if child_a is None:
+                    continue
+
+            state.apply(action, p_pos)
+            if context.pvs and best_action is not None:
+                score = -self._negamax(1 - p_pos, depth - 1, ply + 1, -child_a - 1, -child_a)
+                # it beat child_a, so its exact score is needed unless it is already past b
+                if child_a < score < b:
+                    score = -self._negamax(1 - p_pos, depth - 1, ply + 1, -b, -child_a)
+            else:
+                score = -self._negamax(1 - p_pos, depth - 1, ply + 1, -b, -child_a)
+            state.undo()
+
+            if best_action is None or score > best_score or (is_root and score == best_score
+                                                             and self._generated_before(action, best_action)):
+                best_score = score
+                best_action = action
+                self._update_pv(ply, action)
+            a = max(a, best_score)
+            # the root keeps going, an action generated earlier may tie with the best
+            if a >= b and not is_root:
+                context.record_cutoff(action, p_pos, ply, depth)
+                break
+
+        if best_action is not None:
+            bound = score_bound(sign * best_score, a_ai, b_ai)
+            context.tt.store(key, depth, sign * best_score, bound, best_action)
+        return best_score
+
+    # row ply has room for the plies from ply to the deepest one
+    def _fit_pv_table(self, plies):
+        if len(self._pv_table) < plies:
+            self._pv_table = [[None] * (plies - ply) for ply in range(plies)]
+            self._pv_length = [0] * plies
+
+    # the line from ply is the action followed by the line its child left
+    def _update_pv(self, ply, action):
+        row = self._pv_table[ply]
+        row[0] = action
+        child_length = self._pv_length[ply + 1]
+        row[1:child_length - ply] = self._pv_table[ply + 1][:child_length - ply - 1]
+        self._pv_length[ply] = child_length
+
+    def _generated_before(self, action, other):
+        return self._generation_index[action] < self._generation_index[other]
+
+    # alpha to search the roots child with, or None if it can be skipped. The root picks the first generated action
+    # out of all the ones tied for the best score, so the chosen action doesn't depend on the order they were searched
+    # in (a parallel search gets the same action)
+    def _root_child_alpha(self, action, best_action, a, b):
+        if best_action is None:
+            return a
+        if self._generated_before(action, best_action):
+            # just below alpha so a child that ties with the best gets its exact score
+            return a - 1
+        if a >= b:
+            # a win was already found and this action would lose the tie
+            return None
+        return a
+
+
+# an exact score can always be used, a bound only if it is already outside of the search window
+def tt_score_is_usable(score, bound, a, b):
+    if bound == TranspositionTable.EXACT:
+        return True
+    if bound == TranspositionTable.LOWER_BOUND:
+        return score >= b
+    return score <= a
+
+
+# how a score found with the window (a, b) relates to the real score
+def score_bound(score, a, b):
+    if score <= a:
+        return TranspositionTable.UPPER_BOUND
+    if score >= b:
+        return TranspositionTable.LOWER_BOUND
+    return TranspositionTable.EXACT
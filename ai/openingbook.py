@@ -0,0 +1,77 @@
+import mmap
+import os
+import struct
+
+DEFAULT_BOOK_PATH = os.path.join(os.path.dirname(__file__), 'opening_book.bin')
+
+
+class OpeningBookError(Exception):
+    pass
+
+
+# A file of positions (by GameState.zobrist_key) and the action to play in them, made ahead of time by build_book.py.
+# The entries are sorted by key and found with a binary search directly in the memory mapped file, so opening a book
+# reads nothing up front and every process using the same file shares one copy of it in the os page cache
+class OpeningBook:
+    MAGIC = b'XRBOOK01'
+    # magic, number of entries
+    HEADER = struct.Struct('<8sQ')
+    # key, the 4 coordinates of the action (0 for the None of an add), depth it was searched to
+    ENTRY = struct.Struct('<QBBBBB3x')
+
+    def __init__(self, path):
+        self._path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count = OpeningBook.HEADER.unpack_from(self._mm, 0)
+        if magic != OpeningBook.MAGIC:
+            self._mm.close()
+            raise OpeningBookError(f'{path} is not an opening book')
+
+    @property
+    def path(self):
+        return self._path
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        self._mm.close()
+
+    def _entry(self, i):
+        return OpeningBook.ENTRY.unpack_from(self._mm, OpeningBook.HEADER.size + i * OpeningBook.ENTRY.size)
+
+    # returns (action, depth) for the position, or None if it isn't in the book
+    def probe(self, key):
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry_key = self._entry(mid)[0]
+            if entry_key < key:
+                lo = mid + 1
+            elif entry_key > key:
+                hi = mid
+            else:
+                _, x1, y1, x2, y2, depth = self._entry(mid)
+                return (x1, y1, x2 or None, y2 or None), depth
+        return None
+
+
+# writes entries, a dict of key -> (action, depth), as a book
+def write_book(path, entries):
+    with open(path, 'wb') as f:
+        f.write(OpeningBook.HEADER.pack(OpeningBook.MAGIC, len(entries)))
+        for key in sorted(entries):
+            (x1, y1, x2, y2), depth = entries[key]
+            f.write(OpeningBook.ENTRY.pack(key, x1, y1, x2 or 0, y2 or 0, depth))
+
+
+# one open book per path in each process
+_books = {}
+
+
+# the book at path, or None if there is no book file
+def get_opening_book(path=DEFAULT_BOOK_PATH):
+    if path not in _books:
+        _books[path] = OpeningBook(path) if os.path.exists(path) else None
+    return _books[path]
@@ -0,0 +1,109 @@
+import atexit
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from ai.gamestate import GameState
+from ai.sharedtransposition import SharedTranspositionTable
+
+# set in every worker process by _init_worker
+_shared_alpha = None
+# ai number -> table
+_worker_tts = None
+
+
+def _init_worker(shared_alpha, tt_names, tt_size):
+    global _shared_alpha, _worker_tts
+    _shared_alpha = shared_alpha
+    # every worker probes and stores into the same tables, so what one learns about a position the others reuse
+    _worker_tts = {num: SharedTranspositionTable(tt_size, name) for num, name in tt_names.items()}
+
+
+# Searches one root action in a worker. Returns (score, nodes), or None if it ran out of time.
+# The score is exact if it is at least the shared alpha the search started with
+def _search_root_action(state, action, depth, deadline):
+    # imported here since minimax imports this module
+    from ai.minimax import NegamaxSearch, SearchContext, SearchTimeoutError
+
+    # just below the best score found so far by any worker, so a tie with it is still scored exactly
+    alpha = _shared_alpha.value - 1
+    context = SearchContext(_worker_tts[state.ai.number], deadline)
+    context.can_time_out = deadline is not None
+
+    state.apply(action, 0)
+    try:
+        score = NegamaxSearch(state, context).search(1, depth - 1, 1, alpha, GameState.MAX_SCORE)
+    except SearchTimeoutError:
+        return None
+    return score, context.nodes
+
+
+# Splits the root actions of an iterative deepening search over a pool of processes. Workers share the best score
+# found so far (alpha), so later root actions are searched with a narrower window as results come in.
+# They also share a transposition table in shared memory, one for each player the ai can be. In an ai vs ai game both
+# players use the same pool, and each starting a new search would otherwise age the others entries.
+# Picks the same action as the serial search at the same depth: the best score, ties going to the first generated
+class RootSplitSearch:
+    def __init__(self, workers, tt_size=SharedTranspositionTable.DEFAULT_SIZE):
+        self.workers = workers
+        self._shared_alpha = multiprocessing.Value('q', GameState.MIN_SCORE, lock=False)
+        # ai number -> table
+        self._tts = {num: SharedTranspositionTable(tt_size) for num in (1, 2)}
+        self._pool = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                         initargs=(self._shared_alpha, {num: tt.name for num, tt in self._tts.items()},
+                                                   tt_size))
+        self.nodes = 0
+
+    def close(self):
+        self._pool.shutdown(cancel_futures=True)
+        for tt in self._tts.values():
+            tt.close()
+
+    def get_move(self, state, max_depth, deadline=None):
+        actions = state.get_all_possible_actions(0, True)
+        if len(actions) == 1:
+            return actions[0], None
+
+        self._tts[state.ai.number].new_search()
+        best_k = 0
+        best_score = None
+        for depth in range(1, max_depth + 1):
+            self._shared_alpha.value = GameState.MIN_SCORE
+            # the best action of the last depth goes first, it sets a good alpha for the rest
+            order = [best_k] + [k for k in range(len(actions)) if k != best_k]
+            futures = {self._pool.submit(_search_root_action, state, actions[k], depth,
+                                         deadline if depth > 1 else None): k for k in order}
+
+            scores = {}
+            for future in as_completed(futures):
+                result = future.result()
+                if result is None:
+                    continue
+                score, nodes = result
+                self.nodes += nodes
+                scores[futures[future]] = score
+                if score > self._shared_alpha.value:
+                    self._shared_alpha.value = score
+
+            # the unfinished depth is thrown away
+            if len(scores) < len(actions):
+                break
+            best_k = max(scores, key=lambda k: (scores[k], -k))
+            best_score = scores[best_k]
+            if best_score in (GameState.MAX_SCORE, GameState.MIN_SCORE):
+                break
+
+        return actions[best_k], best_score
+
+
+# one pool per worker count, started on first use and reused by every later search
+_root_split_searches = {}
+
+
+def get_root_split_search(workers):
+    search = _root_split_searches.get(workers)
+    if search is None:
+        search = RootSplitSearch(workers)
+        _root_split_searches[workers] = search
+        # the shared memory has to be freed explicitly
+        atexit.register(search.close)
+    return search
@@ -0,0 +1,45 @@
+import threading
+
+from ai.minimax import endgame_deadline, get_move, SearchContext, SearchCancelledError
+
+
+# Searches the position the ai expects to be in on its next turn while the opponent is still thinking: the position
+# after the opponent plays the reply predicted by the principal variation of the ais last search.
+# The search runs on a thread with no deadline. If the opponent plays the predicted reply, ponder_hit gives it one and
+# waits for it, so the time already spent counts towards the move. Otherwise stop ends it within a few hundred nodes,
+# its transposition table entries and move ordering tables are still there for the real search.
+# A SearchStats given as stats is filled in like for a normal search, its time counts from when pondering started.
+# An endgame is solved with the EndgameSolver given as endgame, for as long as it takes until the ponder hit
+class Ponderer:
+    def __init__(self, state, max_depth, tt, book=None, stats=None, endgame=None):
+        # the key of the predicted position, with the ai to move
+        self.key = state.zobrist_key(0)
+        self.action = None
+        self.context = SearchContext(tt, stop=threading.Event(), book=book, stats=stats, endgame=endgame)
+        self._thread = threading.Thread(target=self._run, args=(state, max_depth), daemon=True)
+        self._thread.start()
+
+    def _run(self, state, max_depth):
+        try:
+            self.action = get_move(state, max_depth, self.context)
+        except SearchCancelledError:
+            pass
+
+    # True if the state is the predicted position
+    def predicts(self, state):
+        return state.zobrist_key(0) == self.key
+
+    # The opponent played the predicted reply. The search keeps going until it finishes or reaches the deadline, then
+    # its action is returned
+    def ponder_hit(self, deadline):
+        self.context.deadline = deadline
+        # a solve that is already running gets half the time left, like solve_endgame would give it
+        if self.context.endgame is not None:
+            self.context.endgame.deadline = endgame_deadline(deadline)
+        self._thread.join()
+        return self.action
+
+    # the opponent played something else or the game is over, the search is no use anymore
+    def stop(self):
+        self.context.stop.set()
+        self._thread.join()
@@ -0,0 +1,91 @@
+import json
+import time
+
+
+# What one get_move call did, filled in when a SearchStats is given to the SearchContext.
+# With no SearchStats nothing here runs, the search only pays for a few "is None" checks
+class SearchStats:
+    # the parts of the search that are timed, see TimedGameState
+    TIMED = ('move_generation', 'apply', 'game_over', 'heuristic')
+
+    def __init__(self):
+        # one dict per iterative deepening depth: depth, nodes, seconds, score, pv and whether it finished
+        self.depths = []
+        self.leaves = 0
+        # nodes that generated actions, and how many actions they generated
+        self.expanded = 0
+        self.children = 0
+        # ply -> alpha/beta cutoffs at that ply
+        self.cutoffs = {}
+        self.times = {name: 0.0 for name in SearchStats.TIMED}
+        self.time = 0.0
+        self.score = None
+        self.pv = []
+
+    @property
+    def nodes(self):
+        return sum(d['nodes'] for d in self.depths)
+
+    @property
+    def branching_factor(self):
+        return self.children / self.expanded if self.expanded else 0.0
+
+    def record_cutoff(self, ply):
+        self.cutoffs[ply] = self.cutoffs.get(ply, 0) + 1
+
+    def record_depth(self, depth, nodes, seconds, score=None, pv=None, completed=True):
+        self.depths.append({'depth': depth, 'nodes': nodes, 'seconds': seconds, 'score': score,
+                            'pv': pv or [], 'completed': completed})
+
+    def to_dict(self):
+        return {'depths': self.depths, 'nodes': self.nodes, 'leaves': self.leaves,
+                'branching_factor': round(self.branching_factor, 2),
+                'cutoffs': {str(ply): n for ply, n in sorted(self.cutoffs.items())},
+                'times': {name: round(t, 6) for name, t in self.times.items()}, 'time': round(self.time, 6),
+                'score': self.score, 'pv': self.pv}
+
+    def to_json_line(self):
+        return json.dumps(self.to_dict()) + '\n'
+
+
+# Wraps the state a search runs on and times the calls of each part of the search into stats.times.
+# Only used when stats are collected, so the normal search calls the GameState directly
+class TimedGameState:
+    def __init__(self, state, stats):
+        self._state = state
+        self._stats = stats
+
+    # everything that isn't timed goes straight to the real state
+    def __getattr__(self, name):
+        return getattr(self._state, name)
+
+    def get_all_possible_actions(self, p_pos, is_ai):
+        start = time.perf_counter()
+        actions = self._state.get_all_possible_actions(p_pos, is_ai)
+        self._stats.times['move_generation'] += time.perf_counter() - start
+        self._stats.expanded += 1
+        self._stats.children += len(actions)
+        return actions
+
+    def apply(self, action, p_pos):
+        start = time.perf_counter()
+        self._state.apply(action, p_pos)
+        self._stats.times['apply'] += time.perf_counter() - start
+
+    def undo(self):
+        start = time.perf_counter()
+        self._state.undo()
+        self._stats.times['apply'] += time.perf_counter() - start
+
+    def game_over(self):
+        start = time.perf_counter()
+        score = self._state.game_over()
+        self._stats.times['game_over'] += time.perf_counter() - start
+        return score
+
+    def get_heuristic_score(self):
+        start = time.perf_counter()
+        score = self._state.get_heuristic_score()
+        self._stats.times['heuristic'] += time.perf_counter() - start
+        self._stats.leaves += 1
+        return score
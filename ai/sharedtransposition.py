@@ -0,0 +1,122 @@
+import struct
+from multiprocessing import shared_memory
+
+from ai.transposition import TranspositionTable
+
+MASK_64 = (1 << 64) - 1
+
+
+# Same interface as TranspositionTable, but the entries live in a block of shared memory so any number of processes
+# can probe and store into one table at the same time.
+# There are no locks. Each entry is 3 words: a check word, the score, and the packed depth, bound, age and best action.
+# The check word is key ^ score ^ packed, so an entry half written by another process (or a different position in the
+# slot) doesn't give back its key when read and is treated as a miss
+class SharedTranspositionTable:
+    EXACT = TranspositionTable.EXACT
+    LOWER_BOUND = TranspositionTable.LOWER_BOUND
+    UPPER_BOUND = TranspositionTable.UPPER_BOUND
+
+    DEFAULT_SIZE = TranspositionTable.DEFAULT_SIZE
+
+    # the first word holds the age of the current search so every process agrees on it
+    HEADER = struct.Struct('<Q')
+    ENTRY = struct.Struct('<QQQ')
+
+    def __init__(self, size=DEFAULT_SIZE, name=None):
+        self._size = size
+        self._owner = name is None
+        nbytes = SharedTranspositionTable.HEADER.size + size * SharedTranspositionTable.ENTRY.size
+        if self._owner:
+            # new shared memory is all zeros, which reads as an empty table since no key is 0 ^ 0 ^ 0
+            self._shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self._buf = self._shm.buf
+
+    # other processes attach with the name and size
+    @property
+    def name(self):
+        return self._shm.name
+
+    @property
+    def size(self):
+        return self._size
+
+    # pickles as a reference to the same shared memory, so it can be handed to worker processes
+    def __getstate__(self):
+        return self._size, self._shm.name
+
+    def __setstate__(self, state):
+        size, name = state
+        self.__init__(size, name)
+
+    def close(self):
+        self._buf.release()
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def _age(self):
+        return SharedTranspositionTable.HEADER.unpack_from(self._buf, 0)[0]
+
+    # only the process that made the table starts new searches, workers just help with the current one
+    def new_search(self):
+        if self._owner:
+            SharedTranspositionTable.HEADER.pack_into(self._buf, 0, (self._age() + 1) & 0xFF)
+
+    def clear(self):
+        self._buf[SharedTranspositionTable.HEADER.size:] = bytes(len(self._buf) - SharedTranspositionTable.HEADER.size)
+
+    def _offset(self, key):
+        return SharedTranspositionTable.HEADER.size + (key % self._size) * SharedTranspositionTable.ENTRY.size
+
+    # returns (depth, score, bound, best_action) if the position is stored, else None
+    def probe(self, key):
+        check, score, packed = SharedTranspositionTable.ENTRY.unpack_from(self._buf, self._offset(key))
+        if check ^ score ^ packed != key:
+            return None
+        depth, bound, _, best_action = unpack_entry(packed)
+        return depth, to_signed(score), bound, best_action
+
+    # same replacement policy as TranspositionTable.store
+    def store(self, key, depth, score, bound, best_action):
+        offset = self._offset(key)
+        age = self._age()
+        check, old_score, old_packed = SharedTranspositionTable.ENTRY.unpack_from(self._buf, offset)
+        if check ^ old_score ^ old_packed == key or old_packed == 0:
+            replace = True
+        else:
+            old_depth, _, old_age, _ = unpack_entry(old_packed)
+            replace = old_age != age or depth >= old_depth
+
+        if replace:
+            score &= MASK_64
+            packed = pack_entry(depth, bound, age, best_action)
+            SharedTranspositionTable.ENTRY.pack_into(self._buf, offset, key ^ score ^ packed, score, packed)
+
+
+def to_signed(word):
+    return word - (1 << 64) if word >> 63 else word
+
+
+# depth, bound and age take a byte each, then a byte per coordinate of the action (0 for the None of an add).
+# The lowest bit is always set so a stored entry is never all zeros
+def pack_entry(depth, bound, age, best_action):
+    packed = 1 | depth << 8 | bound << 16 | age << 24
+    if best_action is not None:
+        for i, coord in enumerate(best_action):
+            if coord is not None:
+                packed |= coord << (32 + 8 * i)
+    return packed
+
+
+def unpack_entry(packed):
+    depth = (packed >> 8) & 0xFF
+    bound = (packed >> 16) & 0xFF
+    age = (packed >> 24) & 0xFF
+    coords = [(packed >> (32 + 8 * i)) & 0xFF for i in range(4)]
+    if coords[0] == 0:
+        best_action = None
+    else:
+        best_action = tuple(c if c != 0 else None for c in coords)
+    return depth, bound, age, best_action
@@ -0,0 +1,41 @@
+# Stores the results of searched positions by their zobrist key so positions reached through a different
+# order of actions don't have to be searched again
+class TranspositionTable:
+    # how the stored score relates to the real score of the position
+    EXACT = 0
+    LOWER_BOUND = 1
+    UPPER_BOUND = 2
+
+    DEFAULT_SIZE = 1 << 18
+
+    def __init__(self, size=DEFAULT_SIZE):
+        self._size = size
+        # each slot holds (key, depth, score, bound, best_action, age) or None
+        self._entries = [None] * size
+        self._age = 0
+
+    @property
+    def size(self):
+        return self._size
+
+    # call before each new search so entries from older searches get replaced first
+    def new_search(self):
+        self._age += 1
+
+    def clear(self):
+        self._entries = [None] * self._size
+
+    # returns (depth, score, bound, best_action) if the position is stored, else None
+    def probe(self, key):
+        entry = self._entries[key % self._size]
+        if entry is not None and entry[0] == key:
+            return entry[1:5]
+        return None
+
+    # Replacement policy: a slot is overwritten if it is empty, holds the same position, comes from an older
+    # search, or was searched less deeply. So deep results of the current search are kept the longest
+    def store(self, key, depth, score, bound, best_action):
+        i = key % self._size
+        old = self._entries[i]
+        if old is None or old[0] == key or old[5] != self._age or depth >= old[1]:
+            self._entries[i] = (key, depth, score, bound, best_action, self._age)
@@ -0,0 +1,105 @@
+from board import Board
+
+# the centres each cell affects, made once per board size
+_WIN_TABLES_BY_SIZE = {}
+
+
+class WinTables:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.stride = height + 2 * WinTracker.PADDING
+
+        s = self.stride
+        self.diagonals = (-s + 1, s + 1, -s - 1, s - 1)
+        # for each cell: the centres whose X or strikethrough it is part of. An X centred on an edge never wins
+        self.centres_of_cell = {}
+        for x in range(1, width + 1):
+            for y in range(1, height + 1):
+                self.centres_of_cell[self.index(x, y)] = [
+                    self.index(cx, cy) for cx, cy in [(x, y), (x - 1, y + 1), (x + 1, y + 1), (x - 1, y - 1),
+                                                      (x + 1, y - 1), (x - 1, y), (x + 1, y)]
+                    if 2 <= cx <= width - 1 and 2 <= cy <= height - 1]
+
+    def index(self, x, y):
+        return (x - 1 + WinTracker.PADDING) * self.stride + (y - 1 + WinTracker.PADDING)
+
+    # pickled as just the board size, like EvaluatorTables
+    def __reduce__(self):
+        return get_win_tables, (self.width, self.height)
+
+
+def get_win_tables(width, height):
+    tables = _WIN_TABLES_BY_SIZE.get((width, height))
+    if tables is None:
+        tables = WinTables(width, height)
+        _WIN_TABLES_BY_SIZE[(width, height)] = tables
+    return tables
+
+
+# Keeps track of every X shape on the board that wins, so GameState.game_over doesn't have to check every token.
+# A cell is only part of the X or the strikethrough of the 7 centres next to it (itself, its 4 diagonals and the
+# cells left and right of it), so a change only rechecks those. Only the cells with a token and the centres that win
+# are stored
+class WinTracker:
+    PADDING = 1
+
+    def __init__(self, width, height, players=()):
+        self._tables = get_win_tables(width, height)
+        # padded index -> player number of every token
+        self._tokens = {}
+        # centre -> number of the player that wins with an X on it, only the centres someone wins on
+        self._wins = {}
+        # indexed by player number, index 0 counts centres changing to or from no win and is never read
+        self._win_counts = [0, 0, 0]
+
+        for player in players:
+            for x, y in player.used_tokens:
+                self.set_cell(x, y, player.number)
+
+    # changes a cell and rechecks the centres it affects. A move is a set_cell to clear and one to place
+    def set_cell(self, x, y, num):
+        i = self._tables.index(x, y)
+        if num == Board.OPEN_SPACE:
+            self._tokens.pop(i, None)
+        else:
+            self._tokens[i] = num
+
+        wins = self._wins
+        for c in self._tables.centres_of_cell[i]:
+            winner = self._winner_at(c)
+            old_winner = wins.get(c, 0)
+            if winner != old_winner:
+                self._win_counts[old_winner] -= 1
+                self._win_counts[winner] += 1
+                if winner:
+                    wins[c] = winner
+                else:
+                    del wins[c]
+
+    # same check as Board.there_is_win_at_using_coords. Cells off the board are never tokens, so an X that reaches
+    # past the edge doesn't win
+    def _winner_at(self, c):
+        tokens = self._tokens
+        num = tokens.get(c)
+        if num is None:
+            return 0
+        for d in self._tables.diagonals:
+            if tokens.get(c + d) != num:
+                return 0
+        left = tokens.get(c - self._tables.stride, num)
+        right = tokens.get(c + self._tables.stride, num)
+        if left != num and right != num:
+            return 0
+        return num
+
+    def has_won(self, num):
+        return self._win_counts[num] > 0
+
+    def copy(self):
+        tracker = WinTracker.__new__(WinTracker)
+        tracker._tables = self._tables
+        tracker._tokens = self._tokens.copy()
+        tracker._wins = self._wins.copy()
+        tracker._win_counts = self._win_counts.copy()
+        return tracker
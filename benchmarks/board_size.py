@@ -0,0 +1,77 @@
+# Times an ai move on boards from the default 12x10 up to the largest size, with the benchmark positions moved to the
+# centre of each board, so the work the engine does per move can be checked against the size of the board.
+# A move is what AiPlayer.get_coordinates does: a search state made from the games board, then a search to the depth.
+# copy and apply/undo are the average of one GameState.copy and of applying and undoing each action at the root.
+# setup is the one off time to make the tables shared by every board of that size.
+# Run from the project folder: python -m benchmarks.board_size [depth] [WIDTHxHEIGHT...]
+import sys
+import time
+
+from ai.gamestate import GameState
+from ai.minimax import get_move, SearchContext
+from benchmarks.positions import get_positions, make_state
+from board import Board
+
+SIZES = [(12, 10), (16, 16), (24, 24), (32, 32), (48, 48), (64, 64)]
+
+# repeats of the copy and apply/undo timings for every position
+REPEATS = 20
+
+
+def timed(f, repeats=1):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        f()
+    return (time.perf_counter() - start) / repeats
+
+
+def time_size(width, height, depth):
+    setup = timed(lambda: make_state(get_positions()[0], Board, width, height))
+    move_time = copy_time = apply_time = 0.0
+    nodes = 0
+    positions = get_positions()
+    for position in positions:
+        game_state = make_state(position, Board, width, height)
+
+        def move():
+            nonlocal nodes
+            state = GameState(game_state.board.copy(), game_state.moves_left,
+                              (game_state.ai.copy(), game_state.opp.copy()))
+            context = SearchContext()
+            get_move(state, depth, context)
+            nodes += context.nodes
+        move_time += timed(move)
+
+        state = make_state(position, Board, width, height)
+        copy_time += timed(state.copy, REPEATS)
+        actions = state.get_all_possible_actions(0, True)
+
+        def apply_undo():
+            for action in actions:
+                state.apply(action, 0)
+                state.undo()
+        apply_time += timed(apply_undo, REPEATS) / len(actions)
+
+    n = len(positions)
+    return setup, move_time / n, copy_time / n, apply_time / n, nodes // n
+
+
+def parse_size(arg):
+    width, height = arg.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    sizes = [parse_size(arg) for arg in sys.argv[2:]] or SIZES
+
+    print(f'{"board":<8} {"cells":>6} {"setup":>9} {"move":>9} {"nodes":>7} {"copy":>9} {"apply/undo":>11}'
+          f'   (depth {depth})')
+    for width, height in sizes:
+        setup, move, copy, apply, nodes = time_size(width, height, depth)
+        print(f'{f"{width}x{height}":<8} {width * height:>6} {setup * 1e3:>7.1f}ms {move * 1e3:>7.1f}ms {nodes:>7} '
+              f'{copy * 1e6:>7.1f}us {apply * 1e6:>9.1f}us')
+
+
+if __name__ == '__main__':
+    main()
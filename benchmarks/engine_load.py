@@ -0,0 +1,108 @@
+# Load test for engineserver.py: many games ask for moves at the same time, each on its own connection and one
+# request after another like a real game would. Reports the latency of the answered requests (p50, p99 and max, as
+# seen by the client so it includes the time spent queued), the requests answered per second and any errors.
+# With --cancel-every N every Nth request of a game is cancelled shortly after it is sent, to check cancelled
+# searches free their worker.
+# Without --port or --unix a server is started in this process for the test.
+# Run from the project folder: python -m benchmarks.engine_load [--games N] [--moves N] [--workers N]
+import argparse
+import asyncio
+import math
+import os
+import time
+
+from benchmarks.positions import get_positions, make_state
+from engineserver import EngineClient, EngineServer, state_to_position, DEFAULT_HOST
+
+# how long after sending a request to cancel it with --cancel-every
+CANCEL_AFTER = 0.05
+
+
+# nearest rank percentile of already sorted values
+def percentile(values, p):
+    if not values:
+        return 0.0
+    return values[max(math.ceil(p * len(values)) - 1, 0)]
+
+
+async def play(game, client, positions, args, results):
+    for k in range(args.moves):
+        position = positions[(game + k) % len(positions)]
+        start = time.perf_counter()
+        request_id = await client.send(position, args.depth, args.time_budget)
+        if args.cancel_every and (k + 1) % args.cancel_every == 0:
+            await asyncio.sleep(CANCEL_AFTER)
+            await client.cancel(request_id)
+        reply = await client.reply(request_id)
+        latency = time.perf_counter() - start
+
+        if 'error' in reply:
+            results['errors'].append(reply['error'])
+        elif reply.get('cancelled'):
+            results['cancelled'] += 1
+        else:
+            results['latencies'].append(latency)
+
+
+async def run(args):
+    server = None
+    if args.port is None and args.unix is None:
+        server = EngineServer(args.workers, max_queued=args.games * 2)
+        await server.start(DEFAULT_HOST, 0)
+        port = server.port
+    else:
+        port = args.port
+
+    positions = [state_to_position(make_state(position)) for position in get_positions()]
+    results = {'latencies': [], 'errors': [], 'cancelled': 0}
+    clients = []
+    try:
+        for _ in range(args.games):
+            client = EngineClient()
+            await client.connect(args.host, port, args.unix)
+            clients.append(client)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(play(game, client, positions, args, results) for game, client in enumerate(clients)))
+        runtime = time.perf_counter() - start
+    finally:
+        for client in clients:
+            await client.close()
+        if server is not None:
+            await server.close()
+    return results, runtime
+
+
+def print_report(results, runtime, args):
+    latencies = sorted(results['latencies'])
+    answered = len(latencies)
+    print(f'{args.games} games x {args.moves} moves, depth {args.depth}, time budget {args.time_budget}s')
+    print(f'answered {answered}, cancelled {results["cancelled"]}, errors {len(results["errors"])} '
+          f'in {runtime:.2f}s, {answered / runtime:.2f} moves/s')
+    print(f'latency p50 {percentile(latencies, 0.5):.3f}s  p99 {percentile(latencies, 0.99):.3f}s  '
+          f'max {latencies[-1] if latencies else 0.0:.3f}s')
+    for error in sorted(set(results['errors'])):
+        print(f'error: {error}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the engine server with many games at once.')
+    parser.add_argument('--games', type=int, default=8, help='games playing at the same time')
+    parser.add_argument('--moves', type=int, default=10, help='moves each game asks for')
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--time-budget', type=float, default=0.5, help='seconds per move')
+    parser.add_argument('--cancel-every', type=int, default=0, help='cancel every Nth request of a game')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='workers of the server started here')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, help='use the server already running on this port')
+    parser.add_argument('--unix', help='use the server already running on this Unix socket')
+    args = parser.parse_args()
+
+    results, runtime = asyncio.run(run(args))
+    print_report(results, runtime, args)
+    if results['errors']:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
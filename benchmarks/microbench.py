@@ -0,0 +1,188 @@
+# Times the Board and GameState calls the search makes the most, over every position in benchmarks.positions, and
+# compares them to a stored baseline so a change that slows down a hot path shows up.
+# ns/op is the average time of one call. alloc is the most memory one call had allocated at once, in bytes.
+# Run from the project folder: python -m benchmarks.microbench [--save] [--baseline FILE] [names...]
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from board import Board
+from bitboard import BitBoard
+from benchmarks.positions import get_positions, make_state
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'microbench_baseline.json')
+
+# a benchmark this much slower (or allocating this much more) than the baseline is marked as a regression
+REGRESSION_THRESHOLD = 0.20
+
+# each benchmark is timed for at least this long
+MIN_TIME_NS = 50_000_000
+
+
+# Every benchmark takes a state and returns the calls to time, so the arguments are made before timing starts.
+# Board calls are benchmarked on both board classes, GameState calls on the Board the ai searches with
+def board_copy(state):
+    return [state.board.copy]
+
+
+def there_is_win_at_using_coords(state):
+    return [lambda x=x, y=y: state.board.there_is_win_at_using_coords(x, y) for x, y in all_tokens(state)]
+
+
+def check_if_someone_won_using_tokens(state):
+    tokens = all_tokens(state)
+    return [lambda: state.board.check_if_someone_won_using_tokens(tokens)]
+
+
+def token_is_lonely(state):
+    return [lambda x=x, y=y: state.board.token_is_lonely(x, y)
+            for x in range(1, state.board.width + 1) for y in range(1, state.board.height + 1)]
+
+
+def found_h_win_strat(state):
+    return [lambda num=player.number: state.board.found_h_win_strat(num) for player in state.players]
+
+
+def get_all_possible_actions(state):
+    return [lambda: state.get_all_possible_actions(0, True)]
+
+
+def new_state_from_action(state):
+    return [lambda action=action: state.new_state_from_action(action, 0)
+            for action in state.get_all_possible_actions(0, True)]
+
+
+def apply_undo(state):
+    def call(action):
+        state.apply(action, 0)
+        state.undo()
+    return [lambda action=action: call(action) for action in state.get_all_possible_actions(0, True)]
+
+
+def game_over(state):
+    return [state.game_over]
+
+
+def get_heuristic_score(state):
+    return [state.get_heuristic_score]
+
+
+def all_tokens(state):
+    return list(state.all_tokens())
+
+
+BOARD_BENCHMARKS = [
+    ('copy', board_copy),
+    ('there_is_win_at_using_coords', there_is_win_at_using_coords),
+    ('check_if_someone_won_using_tokens', check_if_someone_won_using_tokens),
+    ('token_is_lonely', token_is_lonely),
+    ('found_h_win_strat', found_h_win_strat),
+]
+
+GAME_STATE_BENCHMARKS = [
+    ('get_all_possible_actions', get_all_possible_actions),
+    ('new_state_from_action', new_state_from_action),
+    ('apply_undo', apply_undo),
+    ('game_over', game_over),
+    ('get_heuristic_score', get_heuristic_score),
+]
+
+
+def get_benchmarks():
+    benchmarks = []
+    for board_class in (Board, BitBoard):
+        for name, make_calls in BOARD_BENCHMARKS:
+            benchmarks.append((f'{board_class.__name__}.{name}', board_class, make_calls))
+    for name, make_calls in GAME_STATE_BENCHMARKS:
+        benchmarks.append((f'GameState.{name}', Board, make_calls))
+    return benchmarks
+
+
+# ns per call, timing rounds of every call of every position until MIN_TIME_NS has passed
+def time_calls(calls):
+    rounds = 0
+    start = time.perf_counter_ns()
+    elapsed = 0
+    while elapsed < MIN_TIME_NS:
+        for call in calls:
+            call()
+        rounds += 1
+        elapsed = time.perf_counter_ns() - start
+    return elapsed / (rounds * len(calls))
+
+
+# largest amount of memory a single call had allocated at once
+def peak_alloc(calls):
+    peak = 0
+    tracemalloc.start()
+    for call in calls:
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        call()
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+    return peak
+
+
+def run_benchmark(board_class, make_calls):
+    calls = []
+    for position in get_positions():
+        calls.extend(make_calls(make_state(position, board_class)))
+    return {'ns_per_op': round(time_calls(calls), 1), 'alloc': peak_alloc(calls)}
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def change(new, old):
+    return (new - old) / old if old else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the Board and GameState hot paths against a baseline.')
+    parser.add_argument('names', nargs='*', help='only run benchmarks with one of these in their name')
+    parser.add_argument('--save', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline)
+    results = {}
+    regressions = []
+    print(f'{"benchmark":<45} {"ns/op":>11} {"alloc":>9} {"vs baseline":>12}')
+    for name, board_class, make_calls in get_benchmarks():
+        if args.names and not any(n in name for n in args.names):
+            continue
+        result = run_benchmark(board_class, make_calls)
+        results[name] = result
+
+        compared = ''
+        old = baseline.get(name)
+        if old is not None:
+            time_change = change(result['ns_per_op'], old['ns_per_op'])
+            alloc_change = change(result['alloc'], old['alloc'])
+            compared = f'{time_change:>+11.1%}'
+            if time_change > REGRESSION_THRESHOLD or alloc_change > REGRESSION_THRESHOLD:
+                regressions.append(name)
+                compared += ' REGRESSION'
+        print(f'{name:<45} {result["ns_per_op"]:>11.0f} {result["alloc"]:>9} {compared}')
+
+    if args.save:
+        # keeps the baseline of any benchmark that wasn't run
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f'saved baseline to {args.baseline}')
+    elif regressions:
+        print(f'{len(regressions)} regression(s) over {REGRESSION_THRESHOLD:.0%}: {", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
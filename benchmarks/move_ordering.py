@@ -0,0 +1,39 @@
+# Compares the nodes visited by a fixed depth search with and without killer/history move ordering.
+# Run from the project folder: python -m benchmarks.move_ordering [depth]
+import sys
+import time
+
+from ai.minimax import NegamaxSearch, SearchContext
+from benchmarks.positions import get_positions, make_state
+
+
+def search_nodes(position, depth, order_moves):
+    context = SearchContext(order_moves=order_moves)
+    runtime = time.time()
+    score = NegamaxSearch(make_state(position), context).search(0, depth)
+    return context.nodes, time.time() - runtime, score
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    totals = [0, 0]
+    print(f'{"position":<10} {"plain":>9} {"ordered":>9} {"change":>8}   (depth {depth})')
+    for position in get_positions():
+        plain_nodes, plain_time, plain_score = search_nodes(position, depth, False)
+        ordered_nodes, ordered_time, ordered_score = search_nodes(position, depth, True)
+        # move ordering must only change how much is searched, never the result
+        assert plain_score == ordered_score
+
+        totals[0] += plain_nodes
+        totals[1] += ordered_nodes
+        change = (ordered_nodes - plain_nodes) / plain_nodes * 100
+        print(f'{position[0]:<10} {plain_nodes:>9} {ordered_nodes:>9} {change:>7.1f}%'
+              f'   {plain_time:.2f}s -> {ordered_time:.2f}s')
+
+    change = (totals[1] - totals[0]) / totals[0] * 100
+    print(f'{"total":<10} {totals[0]:>9} {totals[1]:>9} {change:>7.1f}%')
+
+
+if __name__ == '__main__':
+    main()
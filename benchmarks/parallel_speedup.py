@@ -0,0 +1,45 @@
+# Times the root split search for different worker counts against the serial search at the same depth, and checks
+# they all pick the same action.
+# Run from the project folder: python -m benchmarks.parallel_speedup [depth] [worker counts...]
+import sys
+import time
+
+from ai.minimax import get_move
+from ai.parallel import get_root_split_search
+from benchmarks.positions import get_positions, make_state
+
+
+def timed_move(state, depth, workers):
+    runtime = time.time()
+    action = get_move(state, depth, workers=workers)
+    return action, time.time() - runtime
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    worker_counts = [int(w) for w in sys.argv[2:]] or [2, 4]
+
+    # start the pools first so process start up isn't timed
+    for workers in worker_counts:
+        get_root_split_search(workers)
+
+    totals = [0.0] * (len(worker_counts) + 1)
+    print(f'{"position":<10} {"serial":>8}' + ''.join(f' {f"{w} workers":>10}' for w in worker_counts)
+          + f'   (depth {depth})')
+    for position in get_positions():
+        serial_action, serial_time = timed_move(make_state(position), depth, 1)
+        row = f'{position[0]:<10} {serial_time:>7.2f}s'
+        totals[0] += serial_time
+        for i, workers in enumerate(worker_counts):
+            action, runtime = timed_move(make_state(position), depth, workers)
+            # must match the serial search
+            assert action == serial_action, (position[0], workers, action, serial_action)
+            totals[i + 1] += runtime
+            row += f' {runtime:>9.2f}s'
+        print(row)
+
+    print(f'{"speedup":<10} {1:>7.2f}x' + ''.join(f' {totals[0] / t:>9.2f}x' for t in totals[1:]))
+
+
+if __name__ == '__main__':
+    main()
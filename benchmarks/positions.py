@@ -0,0 +1,51 @@
+from ai.gamestate import GameState
+from bitboard import BitBoard
+from board import Board
+from players.player import Player
+
+# Fixed positions used by the benchmarks as (name, ai tokens, opponent tokens, moves left).
+# The ai is player 1, it is the ai's turn and both players started with 15 tokens. None of them are already won
+POSITIONS = [
+    ('early-4', [(7, 8), (5, 5)], [(4, 6), (3, 7)], 30),
+    ('early-6', [(4, 7), (4, 6), (7, 3)], [(7, 4), (8, 7), (6, 4)], 30),
+    ('early-8', [(8, 5), (8, 8), (3, 6), (6, 4)], [(8, 7), (4, 7), (8, 2), (9, 7)], 30),
+    ('mid-12', [(3, 8), (9, 3), (3, 7), (9, 2), (9, 4), (4, 6)],
+     [(4, 7), (6, 4), (4, 8), (4, 2), (5, 7), (5, 5)], 30),
+    ('mid-16', [(6, 8), (4, 5), (5, 7), (3, 6), (3, 2), (9, 7), (5, 4), (3, 5)],
+     [(9, 6), (6, 7), (7, 7), (6, 6), (3, 3), (4, 4), (5, 6), (7, 8)], 30),
+    ('mid-18', [(4, 3), (4, 6), (3, 7), (5, 4), (4, 4), (4, 5), (3, 3), (8, 3), (7, 5)],
+     [(6, 8), (6, 7), (7, 6), (8, 2), (6, 2), (6, 5), (8, 5), (7, 7), (6, 3)], 30),
+    ('late-24', [(5, 3), (7, 7), (9, 5), (6, 7), (5, 8), (3, 5), (8, 2), (4, 5), (7, 6), (6, 2), (6, 5), (4, 7)],
+     [(8, 8), (9, 6), (3, 2), (4, 3), (6, 6), (8, 4), (8, 7), (3, 8), (8, 5), (3, 3), (4, 8), (7, 3)], 30),
+    ('late-26', [(7, 8), (5, 5), (7, 3), (4, 4), (5, 3), (6, 8), (4, 5), (4, 7), (6, 3), (6, 4), (5, 7), (8, 5),
+                 (7, 2)],
+     [(4, 6), (3, 7), (8, 8), (6, 2), (4, 2), (7, 4), (9, 4), (9, 5), (3, 5), (7, 7), (6, 7), (3, 8), (5, 8)], 30),
+    ('late-28', [(7, 3), (8, 6), (3, 4), (4, 8), (5, 4), (3, 7), (5, 3), (7, 7), (4, 3), (3, 2), (6, 5), (7, 5),
+                 (7, 8), (6, 4)],
+     [(4, 7), (8, 5), (9, 3), (5, 7), (8, 3), (8, 4), (4, 6), (3, 5), (8, 2), (9, 5), (9, 7), (6, 8), (6, 2),
+      (8, 8)], 30),
+    ('moves-24', [(3, 6), (5, 3), (5, 7), (5, 5), (5, 6), (3, 8), (8, 6), (9, 5), (5, 4), (6, 4), (4, 8), (9, 7),
+                  (4, 6), (9, 1), (6, 5)],
+     [(7, 6), (6, 3), (3, 4), (3, 5), (3, 7), (5, 2), (8, 4), (7, 2), (8, 3), (8, 5), (9, 4), (9, 6), (8, 9),
+      (4, 4), (2, 1)], 24),
+]
+
+
+# The positions are on the default 12x10 board. On a bigger board they are moved so they stay around its centre
+def make_state(position, board_class=BitBoard, width=Board.DEFAULT_BOARD_WIDTH, height=Board.DEFAULT_BOARD_HEIGHT):
+    name, ai_tokens, opp_tokens, moves_left = position
+    dx = (width - Board.DEFAULT_BOARD_WIDTH) // 2
+    dy = (height - Board.DEFAULT_BOARD_HEIGHT) // 2
+    ai_tokens = [(x + dx, y + dy) for x, y in ai_tokens]
+    opp_tokens = [(x + dx, y + dy) for x, y in opp_tokens]
+    board = board_class(width, height)
+    ai = Player(1, '■', Player.DEFAULT_INITIAL_TOKEN_COUNT - len(ai_tokens), list(ai_tokens))
+    opp = Player(2, '□', Player.DEFAULT_INITIAL_TOKEN_COUNT - len(opp_tokens), list(opp_tokens))
+    for player in (ai, opp):
+        for x, y in player.used_tokens:
+            board.set_player_num_in_coord(x, y, player.number)
+    return GameState(board, moves_left, (ai, opp))
+
+
+def get_positions(names=None):
+    return [p for p in POSITIONS if names is None or p[0] in names]
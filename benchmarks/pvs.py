@@ -0,0 +1,49 @@
+# Compares the nodes visited by an iterative deepening search to a fixed depth with plain alpha-beta, with principal
+# variation search, and with principal variation search and aspiration windows. All three must pick the same action
+# with the same score.
+# Run from the project folder: python -m benchmarks.pvs [depth]
+import sys
+import time
+
+from ai.minimax import get_move, SearchContext
+from benchmarks.positions import get_positions, make_state
+
+MODES = [
+    ('plain', {'pvs': False, 'aspiration': False}),
+    ('pvs', {'pvs': True, 'aspiration': False}),
+    ('pvs+asp', {'pvs': True, 'aspiration': True}),
+]
+
+
+def search_nodes(position, depth, options):
+    context = SearchContext(**options)
+    runtime = time.time()
+    action = get_move(make_state(position), depth, context)
+    return context.nodes, time.time() - runtime, (action, context.score)
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+
+    totals = [[0, 0.0] for _ in MODES]
+    print(f'{"position":<10}' + ''.join(f' {name:>9}' for name, _ in MODES) + f'   (depth {depth})')
+    for position in get_positions():
+        row = f'{position[0]:<10}'
+        results = []
+        for i, (name, options) in enumerate(MODES):
+            nodes, runtime, result = search_nodes(position, depth, options)
+            results.append(result)
+            totals[i][0] += nodes
+            totals[i][1] += runtime
+            row += f' {nodes:>9}'
+        # the search modes must only change how much is searched, never the result
+        assert all(result == results[0] for result in results), (position[0], results)
+        print(row)
+
+    print(f'{"total":<10}' + ''.join(f' {nodes:>9}' for nodes, _ in totals))
+    print(f'{"change":<10}' + ''.join(f' {(nodes - totals[0][0]) / totals[0][0] * 100:>8.1f}%' for nodes, _ in totals))
+    print(f'{"time":<10}' + ''.join(f' {runtime:>8.2f}s' for _, runtime in totals))
+
+
+if __name__ == '__main__':
+    main()
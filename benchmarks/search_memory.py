@@ -0,0 +1,229 @@
+# Compares the memory of a fixed depth search with the MiniMax node objects the ai used to search with against
+# NegamaxSearch, and checks they get the same score. The searches run without a transposition table, its entries
+# would be the same for both and would hide the difference. peak is the most memory the search had allocated at once,
+# kept is what is still held by its result.
+# Run from the project folder: python -m benchmarks.search_memory [depth]
+import sys
+import tracemalloc
+
+from ai.gamestate import GameState
+from ai.minimax import NegamaxSearch, SearchContext, score_bound, tt_score_is_usable
+from benchmarks.positions import get_positions, make_state
+
+
+# stores nothing, so every search does the same work and only the search core allocates
+class NoTable:
+    def new_search(self):
+        pass
+
+    def probe(self, key):
+        return None
+
+    def store(self, key, depth, score, bound, best_action):
+        pass
+
+
+# The original search, one object per node. get_move uses NegamaxSearch, this is only kept as the reference it is
+# measured against
+class MiniMax:
+    is_ai: bool
+    state: GameState
+    DEFAULT_DEPTH = 3
+
+    def __init__(self, state: GameState, is_ai, depth=DEFAULT_DEPTH, action=None, a=GameState.MIN_SCORE,
+                 b=GameState.MAX_SCORE, context=None, ply=0):
+        self.state = state
+        self.is_ai = is_ai
+        self.depth = depth
+        self.ply = ply
+        self.action = action
+        self.a = a
+        self.b = b
+        self.context = context if context is not None else SearchContext()
+
+        self.actions = []
+        # only for the root: action -> its position in the order the actions were generated
+        self.generation_index = None
+        self.p_pos = 0 if is_ai else 1
+        # Start with worst possible score
+        self.score = GameState.MIN_SCORE if is_ai else GameState.MAX_SCORE
+        self.next_best_node = None
+
+    @property
+    def players(self):
+        return self.state.players
+
+    @property
+    def is_root(self):
+        return self.action is None
+
+    # applies the action to the shared state, the caller must undo it once the child has run
+    def gen_child(self, action, a, b):
+        self.state.apply(action, self.p_pos)
+        return MiniMax(self.state, not self.is_ai, self.depth - 1, action, a, b, self.context, self.ply + 1)
+
+    # def gen_children(self, a, b):
+    #     self.actions = self.state.get_all_possible_actions(self.p_pos, self.is_ai)
+    #     for action in self.actions:
+    #         next_possible_state = self.state.new_state_from_action(action, self.p_pos)
+    #         self.children.append(MiniMax(next_possible_state, not self.is_ai, self.depth - 1, action, a, b))
+
+    def run(self):
+        self.context.visit_node()
+
+        # FIRST HANDLE BASE CASES
+        # check for game end due to win or draw
+        game_over_score = self.state.game_over()
+        if game_over_score is not None:
+            self.score = game_over_score
+            return self
+
+        # if got to the max depth we wanted, also stop and apply heuristic
+        if self.depth == 0:
+            self.score = self.state.get_heuristic_score()
+            return self
+
+        # the same position may already have been searched through a different order of actions
+        key = self.state.zobrist_key(self.p_pos)
+        tt_action = None
+        entry = self.context.tt.probe(key)
+        if entry is not None:
+            tt_depth, tt_score, tt_bound, tt_action = entry
+            # the root always searches, it has to pick an action
+            if tt_depth >= self.depth and not self.is_root and self.tt_score_is_usable(tt_score, tt_bound):
+                self.score = tt_score
+                return self
+
+        # ELSE CONTINUE WITH CHECKING NEXT MOVES
+        # generate all possible next states
+        self.actions = self.state.get_all_possible_actions(self.p_pos, self.is_ai)
+        if self.is_root:
+            self.generation_index = {action: k for k, action in enumerate(self.actions)}
+        self.context.order_actions(self.actions, self.p_pos, self.ply, tt_action)
+
+        a, b = self.a, self.b
+        if self.is_ai:
+            self.maximize()
+        else:
+            self.minimize()
+        self.store_in_tt(key, a, b)
+        return self
+
+    def tt_score_is_usable(self, score, bound):
+        return tt_score_is_usable(score, bound, self.a, self.b)
+
+    # a and b are the window the node was searched with
+    def store_in_tt(self, key, a, b):
+        if self.next_best_node is not None:
+            bound = score_bound(self.score, a, b)
+            self.context.tt.store(key, self.depth, self.score, bound, self.next_best_node.action)
+
+    # The root picks the first generated action out of all the ones tied for the best score, so the chosen action
+    # doesn't depend on the order they were searched in (a parallel search gets the same action)
+    def breaks_tie(self, n):
+        return self.is_root and n.score == self.score \
+            and self.generation_index[n.action] < self.generation_index[self.next_best_node.action]
+
+    # alpha to search the roots child with, or None if it can be skipped
+    def root_child_alpha(self, action):
+        if self.next_best_node is None:
+            return self.a
+        if self.generation_index[action] < self.generation_index[self.next_best_node.action]:
+            # just below alpha so a child that ties with the best gets its exact score
+            return self.a - 1
+        if self.a >= self.b:
+            # a win was already found and this action would lose the tie
+            return None
+        return self.a
+
+    def maximize(self):
+        n: MiniMax
+        for action in self.actions:
+            a = self.root_child_alpha(action) if self.is_root else self.a
+            if a is None:
+                continue
+            n = self.gen_child(action, a, self.b)
+            n_with_score = n.run()
+            self.state.undo()
+
+            if self.next_best_node is None:
+                self.next_best_node = n_with_score
+
+            if n_with_score.score > self.score or self.breaks_tie(n_with_score):
+                self.score = n_with_score.score
+                self.next_best_node = n_with_score
+            # the window only ever narrows, the best score so far can be below the a the parent gave
+            self.a = max(self.a, self.score)
+            # the root keeps going, an action generated earlier may tie with the best
+            if self.a >= self.b and not self.is_root:
+                self.context.record_cutoff(action, self.p_pos, self.ply, self.depth)
+                return self
+        return self
+
+    def minimize(self):
+        n: MiniMax
+        for action in self.actions:
+            n = self.gen_child(action, self.a, self.b)
+            n_with_score = n.run()
+            self.state.undo()
+
+            if self.next_best_node is None:
+                self.next_best_node = n_with_score
+
+            if n_with_score.score < self.score:
+                self.score = n_with_score.score
+                self.next_best_node = n_with_score
+            self.b = min(self.b, self.score)
+            if self.a >= self.b:
+                self.context.record_cutoff(action, self.p_pos, self.ply, self.depth)
+                return self
+        return self
+
+
+def measure(search):
+    tracemalloc.start()
+    score, result = search()
+    kept, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return score, peak, kept
+
+
+def run_minimax(state, context, depth):
+    root = MiniMax(state, True, depth, context=context).run()
+    return root.score, root
+
+
+def run_negamax(state, context, depth):
+    search = NegamaxSearch(state, context)
+    return search.search(0, depth), search
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+
+    totals = [[0, 0], [0, 0]]
+    print(f'{"position":<10} {"minimax peak":>13} {"kept":>8} {"negamax peak":>13} {"kept":>8}   (depth {depth})')
+    for position in get_positions():
+        row = f'{position[0]:<10}'
+        scores = []
+        for i, run in enumerate((run_minimax, run_negamax)):
+            # the state and context are made before measuring, only the search itself is counted
+            state = make_state(position)
+            context = SearchContext(NoTable())
+            score, peak, kept = measure(lambda: run(state, context, depth))
+            scores.append(score)
+            totals[i][0] += peak
+            totals[i][1] += kept
+            row += f' {peak:>13} {kept:>8}'
+        # the search core must only change the memory used, never the result
+        assert scores[0] == scores[1], (position[0], scores)
+        print(row)
+
+    print(f'{"total":<10}' + ''.join(f' {peak:>13} {kept:>8}' for peak, kept in totals))
+    print(f'negamax peak change {(totals[1][0] - totals[0][0]) / totals[0][0] * 100:+.1f}%, '
+          f'kept change {(totals[1][1] - totals[0][1]) / totals[0][1] * 100:+.1f}%')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+from board import Board, BoardOutOfBoundError, BoardAlreadyOccupiedError, BoardNotPlayerTokenError, \
+    BoardInvalidMoveError, move_is_valid
+from players.player import PlayerOutOfTokensError
+from zobrist import get_zobrist_keys
+import numpy as np
+
+
+# precomputed masks for every board size that has been used, so copies never rebuild them
+_MASKS_BY_SIZE = {}
+
+
+class BitBoardMasks:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.full = (1 << (width * height)) - 1
+
+        # for each cell as an X centre: the 5 cells of the X, and the left/right pair that strikes it through.
+        # Edges can never be the centre of an X, so they have no mask
+        self.x_masks = [0] * (width * height)
+        self.strike_masks = [0] * (width * height)
+        for x in range(2, width):
+            for y in range(2, height):
+                i = self.index(x, y)
+                self.x_masks[i] = self.bit(x, y) | self.bit(x - 1, y + 1) | self.bit(x + 1, y + 1) \
+                    | self.bit(x - 1, y - 1) | self.bit(x + 1, y - 1)
+                self.strike_masks[i] = self.bit(x - 1, y) | self.bit(x + 1, y)
+
+        # every cell that can be the bottom left corner of the horizontal win strategy window
+        self.h_strat_origins = 0
+        for x in range(1, width - 4):
+            for y in range(1, height - 2):
+                self.h_strat_origins |= self.bit(x, y)
+
+    # bits are laid out the same way as the numpy board, column by column: board[x - 1][y - 1]
+    def index(self, x, y):
+        return (x - 1) * self.height + (y - 1)
+
+    def bit(self, x, y):
+        return 1 << self.index(x, y)
+
+    # pickled as just the board size, so a board sent to another process doesn't carry every mask with it
+    def __reduce__(self):
+        return get_masks, (self.width, self.height)
+
+
+def get_masks(width, height):
+    masks = _MASKS_BY_SIZE.get((width, height))
+    if masks is None:
+        masks = BitBoardMasks(width, height)
+        _MASKS_BY_SIZE[(width, height)] = masks
+    return masks
+
+
+# Same public api as Board, but each player's tokens are stored as an int bitmask so win checks,
+# occupancy tests and copies are a few integer operations instead of numpy indexing
+class BitBoard:
+    OPEN_SPACE = Board.OPEN_SPACE
+
+    def __init__(self, width=Board.DEFAULT_BOARD_WIDTH, height=Board.DEFAULT_BOARD_HEIGHT, board=None):
+        if board is None:
+            Board.check_size(width, height)
+            self._masks = get_masks(width, height)
+            # index 0 is unused so a players number can index its own bitmask
+            self._bits = [0, 0, 0]
+            self._zobrist_key = 0
+        elif isinstance(board, BitBoard):
+            self._masks = board._masks
+            self._bits = board._bits.copy()
+            self._zobrist_key = board._zobrist_key
+        else:
+            # build from any other board implementation using its tokens
+            self._masks = get_masks(board.width, board.height)
+            self._bits = [0, 0, 0]
+            for x, y, num in board.occupied_cells():
+                self._bits[num] |= self._masks.bit(x, y)
+            self._zobrist_key = board.zobrist_key
+        self._keys = get_zobrist_keys(self.width, self.height)
+
+    @property
+    def width(self):
+        return self._masks.width
+
+    @property
+    def height(self):
+        return self._masks.height
+
+    # NOTE: this builds a new array, writing to it does not change the board
+    @property
+    def np_board(self):
+        np_board = np.zeros((self.width, self.height), dtype=int)
+        for x, y, num in self.occupied_cells():
+            np_board[x - 1][y - 1] = num
+        return np_board
+
+    # (x, y, player number) of every token on the board, player 1s first
+    def occupied_cells(self):
+        for num in (1, 2):
+            bits = self._bits[num]
+            while bits:
+                low = bits & -bits
+                i = low.bit_length() - 1
+                yield i // self.height + 1, i % self.height + 1, num
+                bits ^= low
+
+    # hash of the tokens on the board, kept up to date by every change to the board
+    @property
+    def zobrist_key(self):
+        return self._zobrist_key
+
+    @property
+    def occupied(self):
+        return self._bits[1] | self._bits[2]
+
+    def bits_of(self, num):
+        if num == Board.OPEN_SPACE:
+            return self._masks.full & ~self.occupied
+        return self._bits[num]
+
+    def _cell(self, x, y):
+        i = self._masks.index(x, y)
+        if (self._bits[1] >> i) & 1:
+            return 1
+        if (self._bits[2] >> i) & 1:
+            return 2
+        return Board.OPEN_SPACE
+
+    def coordinates_not_in_bounds(self, x, y):
+        return x < 1 or x > self.width or y < 1 or y > self.height
+
+    # same as Board.get_cell, cells off the board are BORDER
+    def get_cell(self, x, y):
+        if self.coordinates_not_in_bounds(x, y):
+            return Board.BORDER
+        return self._cell(x, y)
+
+    def coordinate_already_occupied(self, x, y):
+        return (self.occupied >> self._masks.index(x, y)) & 1 == 1
+
+    def is_players_token(self, player, x, y):
+        return (self._bits[player.number] >> self._masks.index(x, y)) & 1 == 1
+
+    # compute players adding a token and check all possible errors
+    def add_token_to_board(self, player, x, y):
+        if self.coordinates_not_in_bounds(x, y):
+            raise BoardOutOfBoundError
+        if self.coordinate_already_occupied(x, y):
+            raise BoardAlreadyOccupiedError(self._cell(x, y))
+        if not player.has_tokens():
+            raise PlayerOutOfTokensError
+
+        # place players token on board and reduce their token count
+        self._bits[player.number] |= self._masks.bit(x, y)
+        self._zobrist_key ^= self._keys.cell(player.number, x, y)
+        player.use_token((x, y))
+
+    # compute players moving a token and check all possible errors
+    def move_token_on_board(self, player, x1, y1, x2, y2):
+        if self.coordinates_not_in_bounds(x1, y1) or self.coordinates_not_in_bounds(x2, y2):
+            raise BoardOutOfBoundError
+        if not self.is_players_token(player, x1, y1):
+            raise BoardNotPlayerTokenError(self._cell(x1, y1))
+        if self.coordinate_already_occupied(x2, y2):
+            raise BoardAlreadyOccupiedError(self._cell(x2, y2))
+        if not move_is_valid(x1, y1, x2, y2):
+            raise BoardInvalidMoveError
+
+        # open the original position and take new position
+        self._bits[player.number] ^= self._masks.bit(x1, y1) | self._masks.bit(x2, y2)
+        self._zobrist_key ^= self._keys.cell(player.number, x1, y1) ^ self._keys.cell(player.number, x2, y2)
+        player.update_moved_token(x1, y1, x2, y2)
+
+    # used to visualize the board in command line
+    def print_board(self, players):
+        Board(board=self).print_board(players)
+
+    def get_player_num_in_coord(self, x, y):
+        if self.coordinates_not_in_bounds(x, y):
+            raise BoardOutOfBoundError
+        return self._cell(x, y)
+
+    # sets a cell without any checks or token count changes, used to undo actions
+    def set_player_num_in_coord(self, x, y, num):
+        old_num = self._cell(x, y)
+        if old_num != Board.OPEN_SPACE:
+            self._zobrist_key ^= self._keys.cell(old_num, x, y)
+        if num != Board.OPEN_SPACE:
+            self._zobrist_key ^= self._keys.cell(num, x, y)
+
+        bit = self._masks.bit(x, y)
+        self._bits[1] &= ~bit
+        self._bits[2] &= ~bit
+        if num != Board.OPEN_SPACE:
+            self._bits[num] |= bit
+
+    # NOTE: like Board, takes 0 based coordinates
+    def there_is_an_x_at(self, x, y):
+        i = self._masks.index(x + 1, y + 1)
+        x_mask = self._masks.x_masks[i]
+        return self.bits_of(self._cell(x + 1, y + 1)) & x_mask == x_mask
+
+    # NOTE: like Board, takes 0 based coordinates
+    def x_is_strikethroughed(self, x, y):
+        num = self._cell(x + 1, y + 1)
+        strike_mask = self._masks.strike_masks[self._masks.index(x + 1, y + 1)]
+        return self.occupied & ~self.bits_of(num) & strike_mask == strike_mask
+
+    def there_is_win_at_using_coords(self, x, y):
+        if x <= 1 or x >= self.width or y <= 1 or y >= self.height:
+            return False
+
+        i = self._masks.index(x, y)
+        own = self.bits_of(self._cell(x, y))
+        strike_mask = self._masks.strike_masks[i]
+        if self.occupied & ~own & strike_mask == strike_mask:
+            return False
+        x_mask = self._masks.x_masks[i]
+        return own & x_mask == x_mask
+
+    def check_if_someone_won_using_tokens(self, coords):
+        winner_set = set()
+        for c in coords:
+            if self.there_is_win_at_using_coords(c[0], c[1]):
+                winner_set.add(self._cell(c[0], c[1]))
+        return winner_set
+
+    def check_if_someone_won(self):
+        winner_set = set()
+        for num in (1, 2):
+            own = self._bits[num]
+            other = self.occupied & ~own
+            bits = own
+            while bits:
+                low = bits & -bits
+                i = low.bit_length() - 1
+                bits ^= low
+                x_mask = self._masks.x_masks[i]
+                # edges have an empty mask and are skipped
+                if x_mask and own & x_mask == x_mask:
+                    strike_mask = self._masks.strike_masks[i]
+                    if other & strike_mask != strike_mask:
+                        winner_set.add(num)
+                        break
+        return winner_set
+
+    def copy(self):
+        return BitBoard(board=self)
+
+    def is_full(self):
+        return self.occupied == 0
+
+    # every cell has a token, so no token can be added or moved
+    def has_no_open_space(self):
+        return self.occupied == self._masks.full
+
+    def token_is_lonely(self, x, y):
+        for xi in range(x - 1, x + 2):
+            for yi in range(y - 1, y + 2):
+                if not self.coordinates_not_in_bounds(xi, yi) and self.coordinate_already_occupied(xi, yi):
+                    return False
+        return True
+
+    def win_strat_found(self, num):
+        score = self.found_h_win_strat(num)
+        return score
+
+    # same scoring as Board.found_h_win_strat, but every window is checked at once by shifting the players bits
+    # so each cell of the pattern lines up with the windows bottom left corner
+    def found_h_win_strat(self, num):
+        bits = self.bits_of(num)
+        h = self.height
+        origins = self._masks.h_strat_origins
+
+        left = bits & origins
+        mid = (bits >> 2 * h) & origins
+        right = (bits >> 4 * h) & origins
+        inner_left = (bits >> (h + 1)) & origins
+        inner_right = (bits >> (3 * h + 1)) & origins
+        top = (bits >> (2 * h + 2)) & origins
+
+        full_row = left & mid & right
+        both_inner = full_row & inner_left & inner_right
+        score = 5000 * full_row.bit_count()
+        score += 20000 * both_inner.bit_count()
+        score += 999999 * (both_inner & top).bit_count()
+        score += 80000 * (full_row & (inner_left ^ inner_right)).bit_count()
+        score += 1000 * (left & mid & ~right).bit_count()
+        score += 1000 * (mid & right & ~left).bit_count()
+        return score
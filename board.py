@@ -1,6 +1,9 @@
+from array import array
+
 import numpy as np
 from error import Error
 from players.player import PlayerOutOfTokensError
+from zobrist import get_zobrist_keys
 
 
 class BoardOutOfBoundError(Error):
@@ -24,6 +27,13 @@ class BoardNotPlayerTokenError(Error):
         super().__init__(msg)
 
 
+class BoardSizeError(Error):
+    def __init__(self, width, height):
+        msg = f'ERROR: A board must be from {Board.MIN_BOARD_SIZE}x{Board.MIN_BOARD_SIZE} to ' \
+              f'{Board.MAX_BOARD_SIZE}x{Board.MAX_BOARD_SIZE}, not {width}x{height}. Try again.'
+        super().__init__(msg)
+
+
 class BoardInvalidMoveError(Error):
     def __init__(self):
         msg = 'ERROR: The token must be moved by one space in any of the eight directions. You cannot keep it\n' \
@@ -39,30 +49,161 @@ def move_is_valid(x1, y1, x2, y2):
     return (x1 - 1 <= x2 <= x1 + 1) and (y1 - 1 <= y2 <= y1 + 1)
 
 
+# the letters of column x, A to Z then AA, AB and so on like a spreadsheet
+def column_to_letters(x):
+    letter_a_as_int = 65
+    letters = ''
+    while x > 0:
+        x, r = divmod(x - 1, 26)
+        letters = chr(letter_a_as_int + r) + letters
+    return letters
+
+
 # takes x, y coordinate and prints it in the boards format
 def coord_to_string(x, y):
-    letter_a_as_int = 65
-    x_coord_as_letter = chr(letter_a_as_int + x - 1)
-    return f'{x_coord_as_letter}{y}'
+    return f'{column_to_letters(x)}{y}'
+
+
+# cells of the horizontal win strategy window as (x, y) offsets from its bottom left corner: the 3 cells of the row
+# the X is built on, the 2 cells above between them and the cell that would be the top of the X
+H_STRAT_LEFT = (0, 0)
+H_STRAT_MID = (2, 0)
+H_STRAT_RIGHT = (4, 0)
+H_STRAT_INNER_LEFT = (1, 1)
+H_STRAT_INNER_RIGHT = (3, 1)
+H_STRAT_TOP = (2, 2)
+H_STRAT_CELLS = (H_STRAT_LEFT, H_STRAT_MID, H_STRAT_RIGHT, H_STRAT_INNER_LEFT, H_STRAT_INNER_RIGHT, H_STRAT_TOP)
+
+# index tables of strat_windows, made once per board size and set of patterns
+_STRAT_WINDOWS = {}
+
+
+# Flat indices into a padded Board._cells of every window of the patterns, as a (window, pattern cell) array.
+# patterns are any orientations of the same 6 cells, e.g. H_STRAT_CELLS mirrored, so their windows can all be scored
+# at once by score_strat_windows. Like the original found_h_win_strat loop, windows leave the last column and row of
+# the board clear
+def strat_windows(width, height, patterns=(H_STRAT_CELLS,)):
+    table = _STRAT_WINDOWS.get((width, height, patterns))
+    if table is None:
+        stride = height + 2 * Board.PADDING
+        windows = []
+        for pattern in patterns:
+            dxs = [dx for dx, _ in pattern]
+            dys = [dy for _, dy in pattern]
+            origins = np.array([(x - 1 + Board.PADDING) * stride + (y - 1 + Board.PADDING)
+                                for x in range(1 - min(dxs), width - max(dxs))
+                                for y in range(1 - min(dys), height - max(dys))], dtype=np.intp)
+            windows.append(origins[:, None] + np.array([dx * stride + dy for dx, dy in pattern], dtype=np.intp))
+        table = np.concatenate(windows)
+        _STRAT_WINDOWS[(width, height, patterns)] = table
+    return table
+
+
+# the windows of H_STRAT_CELLS by where they start, made once per board size
+_STRAT_ORIGINS = {}
+
+
+# (origins, offsets): the flat indices into a padded Board._cells where a window starts, and the offsets from the
+# start to the cells of the window. A token at i is in the windows starting at i - offsets that are origins
+def strat_window_origins(width, height):
+    table = _STRAT_ORIGINS.get((width, height))
+    if table is None:
+        stride = height + 2 * Board.PADDING
+        # H_STRAT_LEFT is the first cell and is where the window starts
+        origins = frozenset(strat_windows(width, height)[:, 0].tolist())
+        offsets = tuple(dx * stride + dy for dx, dy in H_STRAT_CELLS)
+        table = (origins, offsets)
+        _STRAT_ORIGINS[(width, height)] = table
+    return table
+
+
+# Board.found_h_win_strat scoring for every window at once. Each argument is a boolean array of whether the players
+# token is in that cell of the windows, windows on the last axis, which is summed
+def score_strat_windows(left, mid, right, inner_left, inner_right, top):
+    full_row = left & mid & right
+    both_inner = full_row & inner_left & inner_right
+    score = 5000 * full_row.sum(axis=-1)
+    score += 20000 * both_inner.sum(axis=-1)
+    score += 999999 * (both_inner & top).sum(axis=-1)
+    score += 80000 * (full_row & (inner_left ^ inner_right)).sum(axis=-1)
+    # 2 of the 3 row cells, the middle one always being one of them
+    score += 1000 * (mid & (left ^ right)).sum(axis=-1)
+    return score
+
+
+# A window's cells as a byte, bit k set when the player has a token in cell k of the pattern
+STRAT_CELL_BITS = (1 << np.arange(len(H_STRAT_CELLS))).astype(np.uint8)
+# the score of a single window by its byte, so scoring a board is one lookup per window
+STRAT_WINDOW_SCORES = score_strat_windows(
+    *((np.arange(1 << len(H_STRAT_CELLS))[:, None] & STRAT_CELL_BITS) > 0).T[:, :, None])
 
 
 class Board:
     DEFAULT_BOARD_WIDTH = 12
     DEFAULT_BOARD_HEIGHT = 10
+    # an X needs 3x3 cells. The largest size is what the engine has been tuned and benchmarked for, see
+    # benchmarks/board_size.py
+    MIN_BOARD_SIZE = 3
+    MAX_BOARD_SIZE = 64
 
     # There is no players 0, so 0 in the Matrix implies an open space
     OPEN_SPACE = 0
 
+    # The cells are stored in a flat list with a border of BORDER cells around the board. The X shapes and patterns
+    # around a token reach at most 2 cells past it, so with PADDING 2 they can read their cells without bounds checks
+    BORDER = -1
+    PADDING = 2
+
+    # found_h_win_strat scores every window of a board up to this many cells, bigger boards only the windows near the
+    # players tokens. Timed over benchmarks.positions moved to the centre of each size, both take about the same time
+    # at 32x32, scoring every window is twice as fast at 12x10 and about twice as slow at 64x64
+    DENSE_STRAT_MAX_CELLS = 1024
+
     def __init__(self, width=DEFAULT_BOARD_WIDTH, height=DEFAULT_BOARD_HEIGHT, board=None):
-        if board is None:
-            self._width = width
-            self._height = height
-            # create the board as 2d Matrix
-            self._board = np.zeros((width, height), dtype=int)
+        if board is not None:
+            width = board.width
+            height = board.height
+        self._width = width
+        self._height = height
+        # cells (x, y) and (x + 1, y) are stride apart in _cells, (x, y) and (x, y + 1) are next to each other
+        self._stride = height + 2 * Board.PADDING
+
+        if isinstance(board, Board):
+            self._cells = board._cells[:]
+            self._tokens = board._tokens.copy()
+            self._zobrist_key = board.zobrist_key
         else:
-            self._width = board.width
-            self._height = board.height
-            self._board = board.np_board.copy()
+            Board.check_size(width, height)
+            # one signed byte per cell, so copying a board copies a few hundred bytes
+            self._cells = array('b', [Board.BORDER]) * ((width + 2 * Board.PADDING) * self._stride)
+            for x in range(1, width + 1):
+                for y in range(1, height + 1):
+                    self._cells[self._index(x, y)] = Board.OPEN_SPACE
+            # padded index -> player number of every token, in the order they were placed. Scans for wins only
+            # look at these instead of every cell
+            self._tokens = {}
+            self._zobrist_key = 0
+            if board is not None:
+                # any other board class, e.g. a BitBoard
+                for x, y, num in board.occupied_cells():
+                    i = self._index(x, y)
+                    self._cells[i] = num
+                    self._tokens[i] = num
+                self._zobrist_key = board.zobrist_key
+        self._keys = get_zobrist_keys(self._width, self._height)
+
+        s = self._stride
+        # offsets from a cell to its diagonals, to the cells left and right of it, and to all 9 cells around it
+        self._diagonals = (-s + 1, s + 1, -s - 1, s - 1)
+        self._left = -s
+        self._right = s
+        self._around = (-s - 1, -s, -s + 1, -1, 0, 1, s - 1, s, s + 1)
+
+    @staticmethod
+    def check_size(width, height):
+        if not (Board.MIN_BOARD_SIZE <= width <= Board.MAX_BOARD_SIZE
+                and Board.MIN_BOARD_SIZE <= height <= Board.MAX_BOARD_SIZE):
+            raise BoardSizeError(width, height)
 
     @property
     def width(self):
@@ -72,130 +213,162 @@ class Board:
     def height(self):
         return self._height
 
+    # NOTE: builds a new array from the cells, changing it doesn't change the board
     @property
     def np_board(self):
-        return self._board
+        np_board = np.zeros((self._width, self._height), dtype=int)
+        for x, y, num in self.occupied_cells():
+            np_board[x - 1][y - 1] = num
+        return np_board
+
+    # (x, y, player number) of every token on the board, in the order they were placed
+    def occupied_cells(self):
+        stride = self._stride
+        for i, num in self._tokens.items():
+            yield i // stride - Board.PADDING + 1, i % stride - Board.PADDING + 1, num
+
+    # hash of the tokens on the board, kept up to date by every change to the board
+    @property
+    def zobrist_key(self):
+        return self._zobrist_key
+
+    def _index(self, x, y):
+        return (x - 1 + Board.PADDING) * self._stride + (y - 1 + Board.PADDING)
 
     def coordinates_not_in_bounds(self, x, y):
         return x < 1 or x > self._width or y < 1 or y > self._height
 
     def coordinate_already_occupied(self, x, y):
-        return self._board[x - 1][y - 1] > 0
+        return self._cells[self._index(x, y)] > 0
 
     def is_players_token(self, player, x, y):
-        return self._board[x - 1][y - 1] == player.number
+        return self._cells[self._index(x, y)] == player.number
+
+    # the player number in a cell, OPEN_SPACE, or BORDER for cells up to PADDING past the edge of the board
+    def get_cell(self, x, y):
+        return self._cells[self._index(x, y)]
 
     # compute players adding a token and check all possible errors
     def add_token_to_board(self, player, x, y):
         if self.coordinates_not_in_bounds(x, y):
             raise BoardOutOfBoundError
-        if self.coordinate_already_occupied(x, y):
-            raise BoardAlreadyOccupiedError(self._board[x - 1][y - 1])
+        i = self._index(x, y)
+        if self._cells[i] > 0:
+            raise BoardAlreadyOccupiedError(self._cells[i])
         if not player.has_tokens():
             raise PlayerOutOfTokensError
 
         # place players token on board and reduce their token count
-        self._board[x - 1][y - 1] = player.number
+        self._cells[i] = player.number
+        self._tokens[i] = player.number
+        self._zobrist_key ^= self._keys.cell(player.number, x, y)
         player.use_token((x, y))
 
     # compute players moving a token and check all possible errors
     def move_token_on_board(self, player, x1, y1, x2, y2):
         if self.coordinates_not_in_bounds(x1, y1) or self.coordinates_not_in_bounds(x2, y2):
             raise BoardOutOfBoundError
-        if not self.is_players_token(player, x1, y1):
-            raise BoardNotPlayerTokenError(self._board[x1 - 1][y1 - 1])
-        if self.coordinate_already_occupied(x2, y2):
-            raise BoardAlreadyOccupiedError(self._board[x2 - 1][y2 - 1])
+        i1 = self._index(x1, y1)
+        i2 = self._index(x2, y2)
+        if self._cells[i1] != player.number:
+            raise BoardNotPlayerTokenError(self._cells[i1])
+        if self._cells[i2] > 0:
+            raise BoardAlreadyOccupiedError(self._cells[i2])
         if not move_is_valid(x1, y1, x2, y2):
             raise BoardInvalidMoveError
 
         # open the original position and take new position
-        self._board[x1 - 1][y1 - 1] = Board.OPEN_SPACE
-        self._board[x2 - 1][y2 - 1] = player.number
+        self._cells[i1] = Board.OPEN_SPACE
+        self._cells[i2] = player.number
+        del self._tokens[i1]
+        self._tokens[i2] = player.number
+        self._zobrist_key ^= self._keys.cell(player.number, x1, y1) ^ self._keys.cell(player.number, x2, y2)
         player.update_moved_token(x1, y1, x2, y2)
 
     # used to visualize the board in command line
     def print_board(self, players):
         result = ''
         # show board
-        for y in range(self._height):
+        for y in range(1, self._height + 1):
             # got string formatting from here: https://stackoverflow.com/questions/8450472
             # number label
-            row = '{0: <2}  |'.format(str(y + 1))
+            row = '{0: <2}  |'.format(str(y))
             # the board itself
-            for x in range(self._width):
-                if self._board[x][y] == 0:
+            for x in range(1, self._width + 1):
+                num = self._cells[self._index(x, y)]
+                if num == Board.OPEN_SPACE:
                     row += '   |'
                 else:
-                    row += f' {players[self._board[x][y] - 1].icon} |'
+                    row += f' {players[num - 1].icon} |'
             result = f'{row}\n' \
                      f'{result}'
         # add letters
         result += '      '
-        letter_a_as_int = 65
-        for i in range(self._width):
-            result += chr(i + letter_a_as_int) + '   '
+        for x in range(1, self._width + 1):
+            result += f'{column_to_letters(x):<4}'
         print(result)
 
     def get_player_num_in_coord(self, x, y):
         if self.coordinates_not_in_bounds(x, y):
             raise BoardOutOfBoundError
-        return self._board[x - 1][y - 1]
+        return self._cells[self._index(x, y)]
+
+    # sets a cell without any checks or token count changes, used to undo actions
+    def set_player_num_in_coord(self, x, y, num):
+        i = self._index(x, y)
+        old_num = self._cells[i]
+        if old_num != Board.OPEN_SPACE:
+            self._zobrist_key ^= self._keys.cell(old_num, x, y)
+        if num != Board.OPEN_SPACE:
+            self._zobrist_key ^= self._keys.cell(num, x, y)
+        self._cells[i] = num
+        if num == Board.OPEN_SPACE:
+            self._tokens.pop(i, None)
+        else:
+            self._tokens[i] = num
 
+    # x and y count from 0 here, like check_if_someone_won
     def there_is_an_x_at(self, x, y):
-        num = self._board[x][y]
-        top_left = self._board[x - 1][y + 1]
-        top_right = self._board[x + 1][y + 1]
-        bottom_left = self._board[x - 1][y - 1]
-        bottom_right = self._board[x + 1][y - 1]
-        for coord in [top_left, top_right, bottom_left, bottom_right]:
-            if coord != num:
+        return self._x_at(self._index(x + 1, y + 1))
+
+    def x_is_strikethroughed(self, x, y):
+        return self._strikethroughed(self._index(x + 1, y + 1))
+
+    def _x_at(self, i):
+        cells = self._cells
+        num = cells[i]
+        for d in self._diagonals:
+            if cells[i + d] != num:
                 return False
         # if loop passed, there's an x
         return True
 
-    def x_is_strikethroughed(self, x, y):
-        num = self._board[x][y]
-        left = self._board[x - 1][y]
-        right = self._board[x + 1][y]
+    def _strikethroughed(self, i):
+        num = self._cells[i]
+        left = self._cells[i + self._left]
+        right = self._cells[i + self._right]
         return left > 0 and left != num and right > 0 and right != num
 
+    # an X centred on the edge of the board never wins, its diagonals off the board are BORDER cells
     def there_is_win_at_using_coords(self, x, y):
-        try:
-            num = self.get_player_num_in_coord(x, y)
-
-            left = self.get_player_num_in_coord(x - 1, y)
-            right = self.get_player_num_in_coord(x + 1, y)
-            if left > 0 and left != num and right > 0 and right != num:
-                return False
-
-            top_left = self.get_player_num_in_coord(x - 1, y + 1)
-            top_right = self.get_player_num_in_coord(x + 1, y + 1)
-            bottom_left = self.get_player_num_in_coord(x - 1, y - 1)
-            bottom_right = self.get_player_num_in_coord(x + 1, y - 1)
-            for coord in [top_left, top_right, bottom_left, bottom_right]:
-                if coord != num:
-                    return False
-            return True
-        except BoardOutOfBoundError as e:
-            return False
+        i = self._index(x, y)
+        return not self._strikethroughed(i) and self._x_at(i)
 
     def check_if_someone_won_using_tokens(self, coords):
         winner_set = set()
         for c in coords:
             if self.there_is_win_at_using_coords(c[0], c[1]):
-                winner_set.add(self._board[c[0] - 1][c[1] - 1])
+                winner_set.add(self._cells[self._index(c[0], c[1])])
         return winner_set
 
+    # only looks at the tokens, an X centred on the edge of the board never wins since its diagonals off the board
+    # are BORDER cells
     def check_if_someone_won(self):
         winner_set = set()
-        # Note: we ignore the edges since an X shape can not be made with them as the center
-        for y in range(1, self._height - 1):
-            for x in range(1, self._width - 1):
-                if self._board[x][y] > 0:
-                    if self.there_is_an_x_at(x, y) and (not self.x_is_strikethroughed(x, y)):
-                        # save players number
-                        winner_set.add(self._board[x][y])
+        for i, num in self._tokens.items():
+            if self._x_at(i) and (not self._strikethroughed(i)):
+                # save players number
+                winner_set.add(num)
         # no one won yet
         return winner_set
 
@@ -203,36 +376,45 @@ class Board:
         return Board(board=self)
 
     def is_full(self):
-        return len(np.where(self._board != 0)[0]) == 0
+        return not self._tokens
 
+    # every cell has a token, so no token can be added or moved
+    def has_no_open_space(self):
+        return len(self._tokens) == self._width * self._height
+
+    # the border cells are never occupied, so the cells around one on the edge need no bounds checks
     def token_is_lonely(self, x, y):
-        surround = 0
-        for xi in range(x - 1, x + 2):
-            for yi in range(y - 1, y + 2):
-                if not self.coordinates_not_in_bounds(xi, yi) and self.coordinate_already_occupied(xi, yi):
-                    surround += 1
-        if surround > 0:
-            return False
+        cells = self._cells
+        i = self._index(x, y)
+        for d in self._around:
+            if cells[i + d] > 0:
+                return False
         return True
 
     def win_strat_found(self, num):
         score = self.found_h_win_strat(num)
         return score
 
+    # every window is scored at once: the window cells are read through a numpy view of _cells and an index table,
+    # and each window's cells are turned into a byte to look up its score. On a big board that is mostly empty
+    # windows, so only the ones with one of the players tokens in them are looked at
     def found_h_win_strat(self, num):
-        score = 0
-        for y in range(0, self._height - 3):
-            for x in range(0, self._width - 5):
-                if self._board[x][y] == num and self._board[x + 2][y] == num and self._board[x + 4][y] == num:
-                    score += 5000
-                    if self._board[x + 1][y + 1] == num and self._board[x + 3][y + 1] == num:
-                        score += 20000
-                        if self._board[x + 2][y + 2] == num:
-                            score += 999999
-                    elif self._board[x + 1][y + 1] == num or self._board[x + 3][y + 1] == num:
-                        score += 80000
-                elif self._board[x][y] == num and self._board[x + 2][y] == num:
-                    score += 1000
-                elif self._board[x + 2][y] == num and self._board[x + 4][y] == num:
-                    score += 1000
-        return score
+        if self._width * self._height > Board.DENSE_STRAT_MAX_CELLS:
+            return self._found_h_win_strat_near_tokens(num)
+        owned = (np.frombuffer(self._cells, dtype=np.int8) == num).view(np.uint8)
+        codes = owned.take(strat_windows(self._width, self._height)) @ STRAT_CELL_BITS
+        return int(STRAT_WINDOW_SCORES.take(codes).sum())
+
+    # Only the windows with one of the players tokens in them can score, so just those are found from the tokens and
+    # scored like found_h_win_strat does. Takes the same time on any size of board
+    def _found_h_win_strat_near_tokens(self, num):
+        origins, offsets = strat_window_origins(self._width, self._height)
+        starts = origins.intersection(i - offset for i, token_num in self._tokens.items() if token_num == num
+                                      for offset in offsets)
+        if not starts:
+            return 0
+
+        starts = np.fromiter(starts, dtype=np.intp, count=len(starts))
+        owned = (np.frombuffer(self._cells, dtype=np.int8).take(starts[:, None] + offsets) == num).view(np.uint8)
+        codes = owned @ STRAT_CELL_BITS
+        return int(STRAT_WINDOW_SCORES.take(codes).sum())
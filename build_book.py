@@ -0,0 +1,78 @@
+# Builds the opening book the ai plays from (see ai/openingbook.py). It walks the opening from an empty board for the
+# ai as player 1 and as player 2: at the ai's turns it searches for its action and stores it, at the opponents turns
+# it follows every add the opponent could make next to the tokens already down (any square for the first token).
+# Run from the project folder: python build_book.py [--plies N] [--depth N] [--out FILE]
+import argparse
+import time
+
+from ai.gamestate import GameState
+from ai.minimax import get_move, SearchContext
+from ai.openingbook import DEFAULT_BOOK_PATH, write_book
+from ai.transposition import TranspositionTable
+from bitboard import BitBoard
+from players.player import Player
+from xruddergame import XRudderGame
+
+
+class BookBuilder:
+    def __init__(self, depth, plies):
+        self.depth = depth
+        self.plies = plies
+        # key -> (action, depth)
+        self.entries = {}
+        # a new one for each player the ai is, see build
+        self._tt = None
+
+    # the opponent's adds that get followed: all the ones the ai itself would consider, or every square on an empty board
+    def replies(self, state):
+        if not state.ai.used_tokens and not state.opp.used_tokens:
+            return [(int(x), int(y), None, None) for x, y, _, _ in state.get_all_possible_adds()]
+        return state.get_adds_in_token_diags_first()
+
+    def expand(self, state, ai_to_move, ply):
+        if ply == self.plies or state.game_over() is not None:
+            return
+
+        if ai_to_move:
+            key = state.zobrist_key(0)
+            if key in self.entries:
+                action = self.entries[key][0]
+            else:
+                action = get_move(state, self.depth, SearchContext(self._tt))
+                self.entries[key] = (action, self.depth)
+            state.apply(action, 0)
+            self.expand(state, False, ply + 1)
+            state.undo()
+        else:
+            for action in self.replies(state):
+                state.apply(action, 1)
+                self.expand(state, True, ply + 1)
+                state.undo()
+
+    def build(self):
+        for ai_number in (1, 2):
+            # the book is searched as if the ai had played every line from the start as this player, so nothing
+            # carries over from the searches as the other player
+            self._tt = TranspositionTable()
+            ai = Player(ai_number, '■')
+            opp = Player(3 - ai_number, '□')
+            state = GameState(BitBoard(), XRudderGame.DEFAULT_STARTING_MOVES_LEFT, (ai, opp))
+            self.expand(state, ai_number == 1, 0)
+        return self.entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the opening book the ai plays from.')
+    parser.add_argument('--plies', type=int, default=4, help='book the ai moves in the first this many plies')
+    parser.add_argument('--depth', type=int, default=5, help='depth each book position is searched to')
+    parser.add_argument('--out', default=DEFAULT_BOOK_PATH)
+    args = parser.parse_args()
+
+    runtime = time.time()
+    entries = BookBuilder(args.depth, args.plies).build()
+    write_book(args.out, entries)
+    print(f'wrote {len(entries)} positions to {args.out} in {time.time() - runtime:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,374 @@
+# Serves engine moves to many games at once over a local TCP or Unix socket. Searches run on a pool of worker
+# processes, requests wait in a bounded queue for a free worker and can be cancelled while waiting or searching.
+# Run from the project folder: python engineserver.py [--port N | --unix PATH] [--workers N] [--max-queued N]
+#
+# Every message is one line of json. A client can send any number of requests on one connection without waiting,
+# replies come back as their searches finish and carry the id of their request.
+#   move:    {"id": "game-7", "position": {...}, "depth": 5, "time_budget": 1.0}
+#   cancel:  {"cancel": "game-7"}
+#   replies: {"id": "game-7", "action": [x1, y1, x2, y2], "score": 123, "depth": 4, "seconds": 0.98}
+#            {"id": "game-7", "action": null, ...} if all of the players tokens are boxed in and it has to pass
+#            {"id": "game-7", "cancelled": true}
+#            {"id": "game-7", "error": "..."}
+# depth and time_budget are optional and default to the servers, a time_budget of null searches to the depth. A
+# position is the player to move and their opponent, see state_to_position
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ai.endgame import EndgameSolver
+from ai.gamestate import GameState
+from ai.minimax import get_move, SearchContext, SearchCancelledError
+from ai.openingbook import get_opening_book
+from ai.transposition import TranspositionTable
+from bitboard import BitBoard
+from board import Board, BoardSizeError
+from players.player import Player
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# deepest a request can ask for, the search is iterative deepening so a time budget usually ends it first
+MAX_DEPTH = 32
+
+
+class EngineRequestError(Exception):
+    pass
+
+
+# The position of a GameState as json, from the side of the ai (the player to move):
+# {"ai": {"number": 1, "tokens": [[x, y], ...], "tokens_left": 13}, "opp": {...}, "moves_left": 30,
+#  "width": 12, "height": 10}
+# width and height can be left out for the default 12x10 board
+def state_to_position(state):
+    return {'ai': player_to_json(state.ai), 'opp': player_to_json(state.opp), 'moves_left': state.moves_left,
+            'width': state.board.width, 'height': state.board.height}
+
+
+def player_to_json(player):
+    return {'number': player.number, 'tokens': [list(coord) for coord in player.used_tokens],
+            'tokens_left': player.tokens_left}
+
+
+def position_to_state(position):
+    try:
+        players = []
+        for side, icon in (('ai', '■'), ('opp', '□')):
+            p = position[side]
+            tokens_left = int(p['tokens_left'])
+            if tokens_left < 0:
+                raise EngineRequestError(f'bad position: {side} tokens_left must not be negative')
+            players.append(Player(int(p['number']), icon, tokens_left, [(int(x), int(y)) for x, y in p['tokens']]))
+        moves_left = int(position['moves_left'])
+        width = int(position.get('width', Board.DEFAULT_BOARD_WIDTH))
+        height = int(position.get('height', Board.DEFAULT_BOARD_HEIGHT))
+    except (KeyError, TypeError, ValueError) as err:
+        raise EngineRequestError(f'bad position: {err!r}')
+    if {player.number for player in players} != {1, 2}:
+        raise EngineRequestError('bad position: the players must be numbers 1 and 2')
+    if moves_left < 0:
+        raise EngineRequestError('bad position: moves_left must not be negative')
+
+    try:
+        board = BitBoard(width, height)
+    except BoardSizeError as err:
+        raise EngineRequestError(f'bad position: {err.get_msg()}')
+    for player in players:
+        for x, y in player.used_tokens:
+            if board.coordinates_not_in_bounds(x, y) or board.coordinate_already_occupied(x, y):
+                raise EngineRequestError(f'bad position: token at {x}, {y} is off the board or on another token')
+            board.set_player_num_in_coord(x, y, player.number)
+    return GameState(board, moves_left, players)
+
+
+# set up by init_worker in every worker process: a stop event per worker slot, and the tables and endgame solvers
+# kept between the searches the process runs. A request can be for either player, so there is a table and solver for
+# each player number the ai can be, like every AiPlayer keeps its own
+_stop_events = None
+# ai number -> table
+_tts = None
+# ai number -> solver
+_endgames = None
+
+
+def init_worker(stop_events):
+    global _stop_events, _tts, _endgames
+    _stop_events = stop_events
+    _tts = {num: TranspositionTable() for num in (1, 2)}
+    _endgames = {num: EndgameSolver() for num in (1, 2)}
+
+
+# Runs in a worker process. Returns the reply fields, or None if the search was cancelled before it had a move
+def search_position(position, depth, time_budget, slot):
+    state = position_to_state(position)
+    deadline = time.time() + time_budget if time_budget is not None else None
+    num = state.ai.number
+    context = SearchContext(_tts[num], deadline, book=get_opening_book(), endgame=_endgames[num],
+                            stop=_stop_events[slot])
+    try:
+        action = get_move(state, depth, context)
+    except SearchCancelledError:
+        return None
+    return {'action': list(action) if action is not None else None, 'score': context.score, 'depth': context.depth}
+
+
+# a request that was received, while it waits for a worker slot or is being searched
+class PendingRequest:
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.task = None
+        # the worker slot searching it, None while it is still queued
+        self.slot = None
+        self.cancelled = False
+
+
+class EngineServer:
+    def __init__(self, workers=os.cpu_count(), max_queued=64, depth=5, time_budget=4.0):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.depth = depth
+        self.time_budget = time_budget
+
+        self._stop_events = [multiprocessing.Event() for _ in range(workers)]
+        self._pool = None
+        self._free_slots = None
+        self._queued = 0
+        self._server = None
+        # task -> writer of every open connection
+        self._connections = {}
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        self._pool = ProcessPoolExecutor(self.workers, initializer=init_worker, initargs=(self._stop_events,))
+        # a search holds one slot, so at most workers searches run and the rest wait in the queue
+        self._free_slots = asyncio.Queue()
+        for slot in range(self.workers):
+            self._free_slots.put_nowait(slot)
+
+        if unix_path is not None:
+            self._server = await asyncio.start_unix_server(self.handle_connection, path=unix_path)
+        else:
+            self._server = await asyncio.start_server(self.handle_connection, host, port)
+        return self._server
+
+    # the TCP port the server listens on, for a server started on port 0
+    @property
+    def port(self):
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        # closing a connection ends its handle_connection as if the client had left
+        for writer in self._connections.values():
+            writer.close()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self._server.wait_closed()
+        for event in self._stop_events:
+            event.set()
+        self._pool.shutdown(cancel_futures=True)
+
+    async def handle_connection(self, reader, writer):
+        # request id -> PendingRequest, ids only have to be unique on their own connection
+        pending = {}
+        self._connections[asyncio.current_task()] = writer
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    if not isinstance(message, dict):
+                        raise ValueError('a message must be a json object')
+                except ValueError as err:
+                    await self._reply(writer, {'id': None, 'error': f'bad message: {err}'})
+                    continue
+
+                if 'cancel' in message:
+                    if type(message['cancel']) in (str, int):
+                        self.cancel(pending.get(message['cancel']))
+                    continue
+
+                request_id = message.get('id')
+                if type(request_id) not in (str, int):
+                    await self._reply(writer, {'id': None, 'error': 'id must be a string or a whole number'})
+                elif request_id in pending:
+                    await self._reply(writer, {'id': request_id, 'error': 'a request with this id is running'})
+                elif self._queued >= self.max_queued:
+                    await self._reply(writer, {'id': request_id, 'error': f'server busy, {self._queued} queued'})
+                else:
+                    request = PendingRequest(request_id)
+                    pending[request_id] = request
+                    # counted as queued from now, a burst of requests read at once can't go over max_queued
+                    self._queued += 1
+                    request.task = asyncio.create_task(self._serve(message, request, pending, writer))
+                    # lets the task run up to waiting for a slot, a task cancelled before it starts would never
+                    # reach the code that takes it off the queue and replies
+                    await asyncio.sleep(0)
+        finally:
+            # the client is gone, nobody will read what is still being searched for it
+            for request in list(pending.values()):
+                self.cancel(request)
+            writer.close()
+            del self._connections[asyncio.current_task()]
+
+    def cancel(self, request):
+        if request is None or request.cancelled:
+            return
+        request.cancelled = True
+        if request.slot is None:
+            request.task.cancel()
+        else:
+            self._stop_events[request.slot].set()
+
+    async def _serve(self, message, request, pending, writer):
+        start = time.perf_counter()
+        reply = {'id': request.request_id}
+        try:
+            try:
+                depth, time_budget = self._search_options(message)
+                slot = await self._free_slots.get()
+            finally:
+                self._queued -= 1
+            request.slot = slot
+            try:
+                self._stop_events[slot].clear()
+                result = await asyncio.get_running_loop().run_in_executor(
+                    self._pool, search_position, message.get('position'), depth, time_budget, slot)
+            finally:
+                self._free_slots.put_nowait(slot)
+
+            if request.cancelled or result is None:
+                reply['cancelled'] = True
+            else:
+                reply.update(result)
+                reply['seconds'] = round(time.perf_counter() - start, 4)
+        except asyncio.CancelledError:
+            reply['cancelled'] = True
+        except Exception as err:
+            reply['error'] = f'{type(err).__name__}: {err}'
+        finally:
+            del pending[request.request_id]
+        await self._reply(writer, reply)
+
+    def _search_options(self, message):
+        depth = message.get('depth', self.depth)
+        time_budget = message.get('time_budget', self.time_budget)
+        if type(depth) is not int or not 1 <= depth <= MAX_DEPTH:
+            raise EngineRequestError(f'depth must be a whole number from 1 to {MAX_DEPTH}')
+        if time_budget is not None and (type(time_budget) not in (int, float) or time_budget <= 0):
+            raise EngineRequestError('time_budget must be a positive number of seconds or null')
+        return depth, time_budget
+
+    @staticmethod
+    async def _reply(writer, reply):
+        if writer.is_closing():
+            return
+        writer.write(json.dumps(reply).encode() + b'\n')
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+
+# Sends requests to an EngineServer over one connection and matches the replies to them by id, so a single client
+# can have many requests in flight
+class EngineClient:
+    def __init__(self):
+        self._reader = None
+        self._writer = None
+        self._replies = {}
+        self._next_id = 0
+        self._read_task = None
+
+    async def connect(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        if unix_path is not None:
+            self._reader, self._writer = await asyncio.open_unix_connection(unix_path)
+        else:
+            self._reader, self._writer = await asyncio.open_connection(host, port)
+        self._read_task = asyncio.create_task(self._read_replies())
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+        self._read_task.cancel()
+
+    # sends a move request and returns its id, wait for the reply with reply(request_id)
+    async def send(self, position, depth=None, time_budget=None):
+        request_id = self._next_id
+        self._next_id += 1
+        message = {'id': request_id, 'position': position}
+        if depth is not None:
+            message['depth'] = depth
+        if time_budget is not None:
+            message['time_budget'] = time_budget
+        self._replies[request_id] = asyncio.get_running_loop().create_future()
+        await self._send(message)
+        return request_id
+
+    async def reply(self, request_id):
+        try:
+            return await self._replies[request_id]
+        finally:
+            del self._replies[request_id]
+
+    async def move(self, position, depth=None, time_budget=None):
+        return await self.reply(await self.send(position, depth, time_budget))
+
+    async def cancel(self, request_id):
+        await self._send({'cancel': request_id})
+
+    async def _send(self, message):
+        self._writer.write(json.dumps(message).encode() + b'\n')
+        await self._writer.drain()
+
+    async def _read_replies(self):
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                break
+            reply = json.loads(line)
+            future = self._replies.get(reply.get('id'))
+            if future is not None and not future.done():
+                future.set_result(reply)
+        # the server closed the connection
+        for future in self._replies.values():
+            if not future.done():
+                future.set_exception(ConnectionError('engine server closed the connection'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve engine moves over a local socket.')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', help='listen on this Unix socket path instead of TCP')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--max-queued', type=int, default=64, help='requests waiting for a worker before refusing')
+    parser.add_argument('--depth', type=int, default=5, help='default search depth')
+    parser.add_argument('--time-budget', type=float, default=4.0, help='default seconds per move')
+    args = parser.parse_args()
+
+    async def serve():
+        server = EngineServer(args.workers, args.max_queued, args.depth, args.time_budget)
+        await server.start(args.host, args.port, args.unix)
+        print(f'engine server on {args.unix or f"{args.host}:{args.port}"} with {args.workers} workers')
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
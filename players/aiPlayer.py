@@ -1,6 +1,11 @@
 from ai.gamestate import GameState
-from ai.minimax import get_move
-from players.player import Player
+from ai.endgame import EndgameSolver
+from ai.minimax import get_move, SearchContext
+from ai.openingbook import get_opening_book
+from ai.ponder import Ponderer
+from ai.searchstats import SearchStats
+from ai.transposition import TranspositionTable
+from players.player import Player, PlayerOutOfMovesAndTokensError
 from board import coord_to_string
 import time
 
@@ -13,15 +18,43 @@ class AiPlayer(Player):
     def __init__(self, number, icon, game, num_tokens=Player.DEFAULT_INITIAL_TOKEN_COUNT):
         super().__init__(number, icon, num_tokens)
         self._game = game
-        self.depth = 3
+        # deepest the search will go, it usually runs out of time first
+        self.depth = 5
+        self.time_budget = 4.0
+        # more than 1 splits the search over that many processes
+        self.workers = 1
+        # kept between turns, positions searched last turn are often reached again
+        self._tt = TranspositionTable()
+        # None if no book has been built, see build_book.py
+        self.book = get_opening_book()
+        # solves the game exactly once both players are out of tokens, kept between turns along with what it solved
+        self.endgame = EndgameSolver()
+
+        self.total_think_time = 0.0
+        self.num_moves = 0
+
+        # with collect_stats on, the SearchStats of the last move is kept in last_stats. If stats_file is set the stats
+        # of every move are also appended to it as a line of json
+        self.collect_stats = False
+        self.stats_file = None
+        self.last_stats = None
+
+        # with ponder on, the position after the opponents predicted reply is searched while they think, see Ponderer
+        self.ponder = False
+        self._ponderer = None
 
     def get_label(self):
         return f'Ai({self.number}):'
 
+    # only talks when the game is being shown
+    def say(self, msg):
+        if self._game.render:
+            bot_print(msg)
+
     # prompt for getting human players move
     def get_coordinates(self):
         # get state
-        bot_print('COMPUTING...')
+        self.say('COMPUTING...')
 
         p1 = self._game.players[0]
         p2 = self._game.players[1]
@@ -30,25 +63,91 @@ class AiPlayer(Player):
         else:
             players = (p2, p1)
 
-        state = GameState(self._game.board, self._game.moves_left, players)
+        # search on a copy, the search applies and undoes actions on its board
+        state = GameState(self._game.board.copy(), self._game.moves_left, players)
 
         runtime = time.time()
-        action = get_move(state, self.depth)
+        deadline = runtime + self.time_budget
+        action, ponder_context = self.finish_pondering(state, deadline)
+        if action is not None:
+            context = ponder_context
+            self.say('the opponent played the predicted move, using the search done on their time')
+            if context.stats is not None:
+                self.record_stats(context.stats)
+        else:
+            stats = SearchStats() if self.collect_stats or self.stats_file is not None else None
+            context = SearchContext(self._tt, deadline, stats=stats, book=self.book, endgame=self.endgame)
+            # a ponder search of a position one move away orders moves better than starting from nothing
+            if ponder_context is not None:
+                context.reuse_ordering(ponder_context)
+            action = get_move(state, self.depth, context, self.workers)
+            if stats is not None:
+                self.record_stats(stats)
         runtime = time.time() - runtime
-        bot_print(f'TOOK {runtime} SECONDS!!!')
-
-        if runtime >= 4.2:
-            self.depth = (self.depth - 1) if self.depth > 2 else 2
-        if self.tokens_left == 0:
-            self.depth = 2
+        self.total_think_time += runtime
+        self.num_moves += 1
+        # all of its tokens are boxed in, the game skips its turn like it does for a player out of tokens and moves
+        if action is None:
+            raise PlayerOutOfMovesAndTokensError
+        if context.from_book:
+            self.say(f'played from the opening book, searched to depth {context.depth}')
+        elif context.endgame_result is not None:
+            self.say(f'solved the endgame: {context.endgame_result}')
+        else:
+            self.say(f'found score of {context.score} at depth {context.depth}')
+        self.say(f'TOOK {runtime} SECONDS!!!')
 
         self.print_action(action)
 
+        if self.ponder:
+            self.start_pondering(state, action, context.pv)
+
         return action
 
+    # Ends the search started on the opponents time. Returns its action and context if the opponent played the
+    # predicted reply and it found an action, else None and the context of the stopped search (if there was one)
+    def finish_pondering(self, state, deadline):
+        ponderer = self._ponderer
+        self._ponderer = None
+        if ponderer is None:
+            return None, None
+
+        if ponderer.predicts(state):
+            action = ponderer.ponder_hit(deadline)
+            if action is not None:
+                return action, ponderer.context
+        else:
+            ponderer.stop()
+        return None, ponderer.context
+
+    # starts searching the position after the action and the opponents reply predicted by the principal variation
+    def start_pondering(self, state, action, pv):
+        if len(pv) < 2:
+            return
+        predicted = state.new_state_from_action(action, 0)
+        if predicted.game_over() is not None:
+            return
+        predicted = predicted.new_state_from_action(pv[1], 1)
+        if predicted.game_over() is not None:
+            return
+        stats = SearchStats() if self.collect_stats or self.stats_file is not None else None
+        self._ponderer = Ponderer(predicted, self.depth, self._tt, self.book, stats, self.endgame)
+
+    # a search still running on the opponents time would keep going after the game, so it is stopped
+    def game_ended(self):
+        if self._ponderer is not None:
+            self._ponderer.stop()
+            self._ponderer = None
+
+    def record_stats(self, stats):
+        self.last_stats = stats
+        if self.stats_file is not None:
+            with open(self.stats_file, 'a') as f:
+                f.write(stats.to_json_line())
+
     def print_action(self, action):
         x1, y1, x2, y2 = action
         if x2 is None:
-            bot_print(f'ADDING TOKEN TO {coord_to_string(x1, y1)}')
+            self.say(f'ADDING TOKEN TO {coord_to_string(x1, y1)}')
         else:
-            bot_print(f'MOVING TOKEN FROM {coord_to_string(x1, y1)} TO {coord_to_string(x2, y2)}')
+            self.say(f'MOVING TOKEN FROM {coord_to_string(x1, y1)} TO {coord_to_string(x2, y2)}')
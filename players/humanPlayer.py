@@ -17,15 +17,25 @@ def is_valid_move_input(user_input):
         return is_valid_coordinate_input(coords[0]) and is_valid_coordinate_input(coords[1])
 
 
-# takes letter ignoring cases and gets the corresponding number coordinate (ex: c -> 3)
-def letter_to_coordinate(letter):
+# takes letters ignoring cases and gets the corresponding number coordinate (ex: c -> 3, aa -> 27)
+def letter_to_coordinate(letters):
     letter_a_as_int = 65
-    return ord(letter.upper()) - letter_a_as_int + 1
+    x = 0
+    for letter in letters.upper():
+        x = x * 26 + ord(letter) - letter_a_as_int + 1
+    return x
+
+
+# splits a coordinate into its column letters and row number, ex: 'AB12' -> ('AB', '12')
+def split_coordinate_input(user_input):
+    letters = user_input.rstrip('0123456789')
+    return letters, user_input[len(letters):]
 
 
 def parse_coordinate_from_input(user_input):
-    x = letter_to_coordinate(user_input[0])
-    y = int(user_input[1:])
+    letters, digits = split_coordinate_input(user_input)
+    x = letter_to_coordinate(letters)
+    y = int(digits)
     return x, y
 
 
@@ -37,9 +47,10 @@ def get_coordinate_for_move(user_input):
     return x1, y1, x2, y2
 
 
-# verify string made of one character and a number, ex:'D10'
+# verify string made of column letters and a number, ex:'D10' or 'AB3' on a board wider than 26 columns
 def is_valid_coordinate_input(user_input):
-    return user_input[0].isalpha() and user_input[1:].isdigit()
+    letters, digits = split_coordinate_input(user_input)
+    return letters.isascii() and letters.isalpha() and digits.isdigit()
 
 
 # get's the x,y location the players wants to add a token
@@ -1,4 +1,5 @@
 from error import Error
+from players.tokenRegistry import TokenRegistry
 
 
 class PlayerOutOfTokensError(Error):
@@ -16,9 +17,13 @@ class PlayerOutOfMovesAndTokensError(Error):
 class Player:
     DEFAULT_INITIAL_TOKEN_COUNT = 15
 
+    # used_tokens can be a TokenRegistry, which is used as is, or any coordinates already on the board
     def __init__(self, number, icon, num_tokens=DEFAULT_INITIAL_TOKEN_COUNT, used_tokens=None):
         if used_tokens is None:
-            used_tokens = []
+            used_tokens = TokenRegistry(num_tokens)
+        elif not isinstance(used_tokens, TokenRegistry):
+            used_tokens = list(used_tokens)
+            used_tokens = TokenRegistry(num_tokens + len(used_tokens), used_tokens)
 
         self._number = number
         self._icon = icon
@@ -46,11 +51,19 @@ class Player:
 
     def use_token(self, coord):
         self._tokens_left -= 1
-        self._used_tokens.append(coord)
+        self._used_tokens.add(coord)
 
     def update_moved_token(self, x1, y1, x2, y2):
-        self._used_tokens.remove((x1, y1))
-        self._used_tokens.append((x2, y2))
+        self._used_tokens.move(x1, y1, x2, y2)
+
+    # reverses use_token, the token must be the last one used
+    def return_token(self):
+        self._tokens_left += 1
+        self._used_tokens.pop()
+
+    # reverses update_moved_token, the token keeps its slot so used_tokens is back in the same order
+    def undo_moved_token(self, x1, y1, x2, y2):
+        self._used_tokens.move(x2, y2, x1, y1)
 
     def copy(self):
         return Player(self._number, self._icon, self._tokens_left, self._used_tokens.copy())
@@ -58,6 +71,10 @@ class Player:
     def get_label(self):
         pass
 
+    # called once the game is over, for players that have something to clean up
+    def game_ended(self):
+        pass
+
     # returns
     # x, y, None, None for add_token
     # x1, y1, x2, y2 for move_token from (x1, y1) to (x2, y2)
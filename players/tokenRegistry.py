@@ -0,0 +1,63 @@
+from itertools import islice
+
+
+# The tokens a player has on the board. Each token gets a slot when it's placed and keeps it when it moves, so moving
+# a token (or undoing the move) only changes its slot, found through the cell -> slot map, instead of searching and
+# reordering a list. There is one slot for every token the player can place, the used ones are slots 0 to count - 1
+class TokenRegistry:
+    __slots__ = ('_positions', '_count', '_slot_of')
+
+    def __init__(self, capacity, tokens=()):
+        self._positions = [None] * capacity
+        self._count = 0
+        self._slot_of = {}
+        for coord in tokens:
+            self.add(coord)
+
+    @property
+    def capacity(self):
+        return len(self._positions)
+
+    def __len__(self):
+        return self._count
+
+    # iterates the used slots in place, no list is built
+    def __iter__(self):
+        return islice(self._positions, self._count)
+
+    def __contains__(self, coord):
+        return coord in self._slot_of
+
+    def __getitem__(self, slot):
+        if not 0 <= slot < self._count:
+            raise IndexError(slot)
+        return self._positions[slot]
+
+    def slot_of(self, coord):
+        return self._slot_of[coord]
+
+    def add(self, coord):
+        slot = self._count
+        self._positions[slot] = coord
+        self._slot_of[coord] = slot
+        self._count += 1
+
+    # removes the token added last
+    def pop(self):
+        self._count -= 1
+        coord = self._positions[self._count]
+        self._positions[self._count] = None
+        del self._slot_of[coord]
+        return coord
+
+    def move(self, x1, y1, x2, y2):
+        slot = self._slot_of.pop((x1, y1))
+        self._positions[slot] = (x2, y2)
+        self._slot_of[(x2, y2)] = slot
+
+    def copy(self):
+        registry = TokenRegistry.__new__(TokenRegistry)
+        registry._positions = self._positions.copy()
+        registry._count = self._count
+        registry._slot_of = self._slot_of.copy()
+        return registry
@@ -0,0 +1,141 @@
+# Replays seeded random games on a Board and a BitBoard side by side and checks that every query the game and the
+# ai make of a board gives the same answer on both after each step.
+# Run from the project folder: python -m unittest (or python -m pytest)
+import random
+import unittest
+
+import numpy as np
+
+from bitboard import BitBoard
+from board import Board
+from players.player import Player
+
+# (width, height, steps) of the boards the games are replayed on
+SIZES = [(12, 10, 150), (3, 3, 40), (7, 4, 80), (20, 13, 150), (64, 64, 40)]
+SEEDS = range(4)
+
+
+def random_action(rng, board, player):
+    empty = [(x, y) for x in range(1, board.width + 1) for y in range(1, board.height + 1)
+             if not board.coordinate_already_occupied(x, y)]
+    moves = []
+    for x, y in player.used_tokens:
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                x2, y2 = x + dx, y + dy
+                if (dx or dy) and not board.coordinates_not_in_bounds(x2, y2) \
+                        and not board.coordinate_already_occupied(x2, y2):
+                    moves.append((x, y, x2, y2))
+    if empty and player.has_tokens() and (not moves or rng.random() < 0.7):
+        x, y = rng.choice(empty)
+        return x, y, None, None
+    if moves:
+        return rng.choice(moves)
+    return None
+
+
+class BoardParityTest(unittest.TestCase):
+    # every_cell also compares the cell by cell queries, which is slow so copies only compare the whole board ones
+    def assert_same(self, board, bit_board, players, context, every_cell=True):
+        self.assertTrue(np.array_equal(board.np_board, bit_board.np_board), context)
+        self.assertEqual(board.zobrist_key, bit_board.zobrist_key, context)
+        self.assertEqual(board.check_if_someone_won(), bit_board.check_if_someone_won(), context)
+        self.assertEqual(board.has_no_open_space(), bit_board.has_no_open_space(), context)
+        tokens = [c for player in players for c in player.used_tokens]
+        self.assertEqual(board.check_if_someone_won_using_tokens(tokens),
+                         bit_board.check_if_someone_won_using_tokens(tokens), context)
+        for player in players:
+            self.assertEqual(board.found_h_win_strat(player.number), bit_board.found_h_win_strat(player.number),
+                             context)
+        if not every_cell:
+            return
+        for x in range(1, board.width + 1):
+            for y in range(1, board.height + 1):
+                self.assertEqual(board.get_cell(x, y), bit_board.get_cell(x, y), context)
+                self.assertEqual(board.there_is_win_at_using_coords(x, y),
+                                 bit_board.there_is_win_at_using_coords(x, y), context)
+                self.assertEqual(board.token_is_lonely(x, y), bit_board.token_is_lonely(x, y), context)
+
+    def replay(self, width, height, steps, seed):
+        rng = random.Random(seed)
+        board = Board(width, height)
+        bit_board = BitBoard(width, height)
+        # each board changes the token counts of its own players
+        players = [Player(1, '■'), Player(2, '□')]
+        bit_players = [Player(1, '■'), Player(2, '□')]
+
+        for step in range(steps):
+            p = step % 2
+            action = random_action(rng, board, players[p])
+            if action is None:
+                break
+            x1, y1, x2, y2 = action
+            if x2 is None:
+                board.add_token_to_board(players[p], x1, y1)
+                bit_board.add_token_to_board(bit_players[p], x1, y1)
+            else:
+                board.move_token_on_board(players[p], x1, y1, x2, y2)
+                bit_board.move_token_on_board(bit_players[p], x1, y1, x2, y2)
+            context = f'{width}x{height} seed {seed} step {step} {action}'
+            self.assert_same(board, bit_board, players, context)
+
+            # copies have to match, and stay apart from the board they came from
+            board_copy = board.copy()
+            bit_board_copy = bit_board.copy()
+            self.assert_same(board_copy, bit_board_copy, players, context + ' copy', False)
+            self.assertEqual(board_copy.zobrist_key, board.zobrist_key, context)
+            x, y = rng.randint(1, width), rng.randint(1, height)
+            num = rng.choice([Board.OPEN_SPACE, 1, 2])
+            board_copy.set_player_num_in_coord(x, y, num)
+            bit_board_copy.set_player_num_in_coord(x, y, num)
+            self.assertTrue(np.array_equal(board_copy.np_board, bit_board_copy.np_board), context + ' set')
+            self.assertEqual(board_copy.zobrist_key, bit_board_copy.zobrist_key, context + ' set')
+            self.assert_same(board, bit_board, players, context + ' after copy', False)
+
+            # building one board class from the other keeps every token
+            self.assert_same(Board(board=bit_board), BitBoard(board=board), players, context + ' converted', False)
+
+    def test_random_games(self):
+        for width, height, steps in SIZES:
+            for seed in SEEDS:
+                with self.subTest(size=f'{width}x{height}', seed=seed):
+                    self.replay(width, height, steps, seed)
+
+    def test_undo_with_set_cell(self):
+        rng = random.Random(7)
+        board = Board()
+        bit_board = BitBoard()
+        players = [Player(1, '■'), Player(2, '□')]
+        bit_players = [Player(1, '■'), Player(2, '□')]
+        start = (board.zobrist_key, board.np_board)
+        placed = []
+        for step in range(20):
+            x, y = rng.choice([(x, y) for x in range(1, board.width + 1) for y in range(1, board.height + 1)
+                               if not board.coordinate_already_occupied(x, y)])
+            board.add_token_to_board(players[step % 2], x, y)
+            bit_board.add_token_to_board(bit_players[step % 2], x, y)
+            placed.append((x, y))
+        # clearing every token the way GameState.undo does brings both boards back to the empty board
+        for x, y in reversed(placed):
+            board.set_player_num_in_coord(x, y, Board.OPEN_SPACE)
+            bit_board.set_player_num_in_coord(x, y, Board.OPEN_SPACE)
+            self.assertEqual(board.zobrist_key, bit_board.zobrist_key)
+        self.assertEqual(board.zobrist_key, start[0])
+        self.assertTrue(np.array_equal(board.np_board, start[1]))
+        self.assertTrue(board.is_full() and bit_board.is_full())
+
+    def test_has_no_open_space(self):
+        board = Board(3, 3)
+        bit_board = BitBoard(3, 3)
+        players = [Player(1, '■'), Player(2, '□')]
+        bit_players = [Player(1, '■'), Player(2, '□')]
+        cells = [(x, y) for x in range(1, 4) for y in range(1, 4)]
+        for step, (x, y) in enumerate(cells):
+            self.assertFalse(board.has_no_open_space() or bit_board.has_no_open_space())
+            board.add_token_to_board(players[step % 2], x, y)
+            bit_board.add_token_to_board(bit_players[step % 2], x, y)
+        self.assertTrue(board.has_no_open_space() and bit_board.has_no_open_space())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+# Run from the project folder: python -m unittest (or python -m pytest)
+import threading
+import time
+import unittest
+
+from ai.endgame import EndgameSolver
+from ai.gamestate import GameState
+from ai.minimax import get_move, SearchCancelledError, SearchContext
+from benchmarks.positions import get_positions, make_state
+from bitboard import BitBoard
+from board import Board
+from players.aiPlayer import AiPlayer
+from players.player import Player
+from xruddergame import XRudderGame
+
+
+# a position from the benchmarks where both players are out of tokens, with moves_left token moves to go
+def endgame_state(moves_left):
+    name, ai_tokens, opp_tokens, _ = get_positions(['moves-24'])[0]
+    return make_state((name, ai_tokens, opp_tokens, moves_left))
+
+
+class EndgameSolverTest(unittest.TestCase):
+    def test_stop_ends_a_solve(self):
+        stop = threading.Event()
+        stop.set()
+        solver = EndgameSolver(stop=stop)
+        with self.assertRaises(SearchCancelledError):
+            solver.solve(endgame_state(8))
+        self.assertLessEqual(solver.nodes, EndgameSolver.NODES_PER_TIME_CHECK)
+
+    def test_stop_cancels_get_move_while_solving(self):
+        stop = threading.Event()
+        stop.set()
+        # enough time that the solver is predicted to finish, so it is the one that sees the stop
+        context = SearchContext(deadline=time.time() + 1000, endgame=EndgameSolver(), stop=stop)
+        with self.assertRaises(SearchCancelledError):
+            get_move(endgame_state(4), 3, context)
+        self.assertIsNone(context.endgame_result)
+
+    def test_table_is_bounded(self):
+        solver = EndgameSolver(tt_size=50)
+        result = solver.solve(endgame_state(3))
+        self.assertLessEqual(len(solver._tt), 50)
+        self.assertEqual(str(result), str(EndgameSolver().solve(endgame_state(3))))
+
+    def test_measures_its_speed(self):
+        solver = EndgameSolver(nodes_per_second=1)
+        solver.solve(endgame_state(3))
+        self.assertGreater(solver.nodes, EndgameSolver.MIN_NODES_TO_MEASURE)
+        self.assertGreater(solver.nodes_per_second, 1)
+        self.assertEqual(EndgameSolver(nodes_per_second=1).predicted_seconds(endgame_state(3)),
+                         EndgameSolver.predicted_nodes(endgame_state(3)))
+
+
+# A 4x4 board where the ai's 3 tokens are boxed in by the opponents 6 and both are out of tokens, so the ai has no
+# action but the opponent does
+BOXED_AI_TOKENS = [(1, 1), (1, 2), (2, 1)]
+BOXED_OPP_TOKENS = [(2, 2), (3, 1), (1, 3), (3, 2), (2, 3), (4, 4)]
+
+
+def boxed_in_state():
+    board = BitBoard(4, 4)
+    ai = Player(1, '■', 0, BOXED_AI_TOKENS)
+    opp = Player(2, '□', 0, BOXED_OPP_TOKENS)
+    for player in (ai, opp):
+        for x, y in player.used_tokens:
+            board.set_player_num_in_coord(x, y, player.number)
+    return GameState(board, 5, (ai, opp))
+
+
+class BoxedInTest(unittest.TestCase):
+    def test_solver_has_no_action(self):
+        state = boxed_in_state()
+        self.assertEqual(state.get_all_possible_actions(0, True), [])
+        self.assertIsNone(EndgameSolver().solve(state).action)
+
+    def test_get_move_has_no_action(self):
+        context = SearchContext(deadline=time.time() + 1000, endgame=EndgameSolver())
+        self.assertIsNone(get_move(boxed_in_state(), 3, context))
+        self.assertIsNone(context.endgame_result)
+        self.assertIsNone(get_move(boxed_in_state(), 3))
+
+    # the ai's first turn is skipped instead of it playing the opponents action, then the game goes on to the end
+    def test_game_skips_the_ai(self):
+        game = XRudderGame(Board(4, 4), starting_moves_left=5, render=False)
+        ai = AiPlayer(1, '■', game, len(BOXED_AI_TOKENS))
+        opp = AiPlayer(2, '□', game, len(BOXED_OPP_TOKENS))
+        game.players[:] = [ai, opp]
+        for player, tokens in ((ai, BOXED_AI_TOKENS), (opp, BOXED_OPP_TOKENS)):
+            player.time_budget = 0.2
+            for x, y in tokens:
+                game.board.add_token_to_board(player, x, y)
+        game.play()
+        self.assertTrue(game.is_complete)
+
+
+if __name__ == '__main__':
+    unittest.main()
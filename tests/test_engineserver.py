@@ -0,0 +1,48 @@
+# Run from the project folder: python -m unittest (or python -m pytest)
+import threading
+import unittest
+
+from ai.gamestate import GameState
+from engineserver import EngineRequestError, init_worker, position_to_state, search_position, state_to_position
+from tests.test_endgame import boxed_in_state
+from tests.test_trackers import state_in_play
+
+
+class PositionTest(unittest.TestCase):
+    def test_negative_counts_are_rejected(self):
+        for side in ('ai', 'opp'):
+            with self.subTest(side=side):
+                position = state_to_position(state_in_play(0))
+                position[side]['tokens_left'] = -1
+                with self.assertRaises(EngineRequestError):
+                    position_to_state(position)
+        position = state_to_position(state_in_play(0))
+        position['moves_left'] = -1
+        with self.assertRaises(EngineRequestError):
+            position_to_state(position)
+
+
+# searches in this process with what a worker process is set up with
+class SearchPositionTest(unittest.TestCase):
+    def setUp(self):
+        init_worker([threading.Event()])
+
+    def test_boxed_in_player_passes(self):
+        self.assertIsNone(search_position(state_to_position(boxed_in_state()), 3, None, 0)['action'])
+
+    # the same worker searches the move of one player and then the reply of the other, as if it were new to them
+    def test_players_have_their_own_table(self):
+        for seed in range(5):
+            with self.subTest(seed=seed):
+                state = state_in_play(seed, steps=8)
+                result = search_position(state_to_position(state), 3, None, 0)
+                state.apply(tuple(result['action']), 0)
+                reply_position = state_to_position(GameState(state.board, state.moves_left, (state.opp, state.ai)))
+
+                reply = search_position(reply_position, 3, None, 0)
+                init_worker([threading.Event()])
+                self.assertEqual(reply, search_position(reply_position, 3, None, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
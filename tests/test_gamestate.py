@@ -0,0 +1,96 @@
+# Run from the project folder: python -m unittest (or python -m pytest)
+import unittest
+
+from ai.gamestate import GameState
+from ai.minimax import get_move, SearchContext
+from ai.transposition import TranspositionTable
+from bitboard import BitBoard
+from players.player import Player
+from tests.test_trackers import state_in_play
+
+
+def state_with_opponent_tokens(width, height, opp_tokens):
+    board = BitBoard(width, height)
+    ai = Player(1, '■')
+    opp = Player(2, '□')
+    for x, y in opp_tokens:
+        board.add_token_to_board(opp, x, y)
+    return GameState(board, 30, (ai, opp))
+
+
+class FirstMoveTest(unittest.TestCase):
+    # every action is an add to an empty square on the board
+    def assert_legal(self, state, actions):
+        self.assertTrue(actions)
+        for x, y, x2, y2 in actions:
+            self.assertIsNone(x2)
+            self.assertFalse(state.out_of_bounds_or_occupied(x, y), (x, y))
+
+    def test_opening_squares_are_empty_on_every_small_board(self):
+        for width in range(3, 8):
+            for height in range(3, 8):
+                with self.subTest(size=f'{width}x{height}'):
+                    # the opponent takes the square the ai would open on, then the one it falls back to
+                    opp_tokens = []
+                    for _ in range(3):
+                        state = state_with_opponent_tokens(width, height, opp_tokens)
+                        actions = state.get_all_possible_actions(0, True)
+                        self.assert_legal(state, actions)
+                        opp_tokens.append(actions[0][:2])
+
+    def test_default_board_opens_in_the_centre(self):
+        self.assertEqual(state_with_opponent_tokens(12, 10, []).get_all_possible_actions(0, True),
+                         [(6, 5, None, None)])
+        self.assertEqual(state_with_opponent_tokens(12, 10, [(6, 5)]).get_all_possible_actions(0, True),
+                         [(3, 5, None, None)])
+
+
+# A 3x3 board with one empty square at (2, 3). The ai's X centred on (2, 2) is missing its top corners, which are the
+# opponents, so filling the board wins for neither player
+def nearly_full_state():
+    board = BitBoard(3, 3)
+    ai = Player(1, '■')
+    opp = Player(2, '□')
+    for x, y in [(1, 1), (3, 1), (2, 2), (1, 2)]:
+        board.add_token_to_board(ai, x, y)
+    for x, y in [(1, 3), (3, 3), (3, 2), (2, 1)]:
+        board.add_token_to_board(opp, x, y)
+    return GameState(board, 30, (ai, opp))
+
+
+class FullBoardTest(unittest.TestCase):
+    def test_full_board_is_a_draw(self):
+        state = nearly_full_state()
+        self.assertIsNone(state.game_over())
+        state.apply((2, 3, None, None), 0)
+        self.assertEqual(state.game_over(), 0)
+        self.assertEqual(state.compute_game_over(), 0)
+        state.undo()
+        self.assertIsNone(state.game_over())
+
+    def test_search_scores_filling_the_board_as_a_draw(self):
+        for depth in (1, 2, 3):
+            context = SearchContext()
+            self.assertEqual(get_move(nearly_full_state(), depth, context), (2, 3, None, None))
+            self.assertEqual(context.score, 0)
+
+
+class SharedTableTest(unittest.TestCase):
+    # The ai searches as player 1, plays its move, then the other player searches the position it left as the ai with
+    # the same table. The positions player 1 saw after its own move have to score the same as in a new table
+    def test_table_used_by_both_players(self):
+        for seed in range(10):
+            with self.subTest(seed=seed):
+                state = state_in_play(seed, steps=8)
+                tt = TranspositionTable()
+                state.apply(get_move(state, 3, SearchContext(tt)), 0)
+                other = GameState(state.board.copy(), state.moves_left, (state.opp.copy(), state.ai.copy()))
+
+                shared = SearchContext(tt)
+                fresh = SearchContext()
+                self.assertEqual(get_move(other, 3, shared), get_move(other, 3, fresh))
+                self.assertEqual(shared.score, fresh.score)
+
+
+if __name__ == '__main__':
+    unittest.main()
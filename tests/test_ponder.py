@@ -0,0 +1,96 @@
+# Run from the project folder: python -m unittest (or python -m pytest)
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from ai.endgame import EndgameSolver
+from ai.gamestate import GameState
+from ai.minimax import get_move, SearchContext
+from ai.ponder import Ponderer
+from ai.transposition import TranspositionTable
+from bitboard import BitBoard
+from board import Board
+from tests.test_endgame import endgame_state
+from xruddergame import XRudderGame
+
+
+# a headless ai vs ai game on a small board (with room for every token) where both ais ponder and write their stats to stats_file
+def play_pondering_game(stats_file):
+    game = XRudderGame(board=Board(7, 7), render=False)
+    for player in game.players:
+        player.depth = 2
+        player.time_budget = 0.2
+        player.book = None
+        player.ponder = True
+        player.stats_file = stats_file
+    game.play()
+    return game
+
+
+class PonderTest(unittest.TestCase):
+    def test_no_search_runs_after_the_game(self):
+        threads = threading.active_count()
+        with tempfile.TemporaryDirectory() as folder:
+            game = play_pondering_game(os.path.join(folder, 'stats.jsonl'))
+        self.assertEqual(threading.active_count(), threads)
+        for player in game.players:
+            self.assertIsNone(player._ponderer)
+
+    def test_game_ended_stops_pondering(self):
+        game = XRudderGame(board=Board(7, 7), render=False)
+        ai, opp = game.players
+        ai.depth = 20
+        for player, (x, y) in zip((ai, opp, ai, opp), [(4, 4), (3, 5), (5, 3), (5, 5)]):
+            game.board.add_token_to_board(player, x, y)
+        state = GameState(BitBoard(board=game.board), game.moves_left, (ai, opp))
+        context = SearchContext()
+        action = get_move(state, 2, context)
+
+        # a depth 20 search with no deadline only ends when it is stopped
+        ai.start_pondering(state, action, context.pv)
+        thread = ai._ponderer._thread
+        self.assertTrue(thread.is_alive())
+        ai.game_ended()
+        self.assertFalse(thread.is_alive())
+        self.assertIsNone(ai._ponderer)
+
+    def test_every_move_has_stats(self):
+        with tempfile.TemporaryDirectory() as folder:
+            stats_file = os.path.join(folder, 'stats.jsonl')
+            game = play_pondering_game(stats_file)
+            with open(stats_file) as f:
+                lines = [json.loads(line) for line in f]
+        # moves from the opening book or the endgame solver have stats too, just without any depths
+        self.assertEqual(len(lines), sum(player.num_moves for player in game.players))
+
+
+class PonderEndgameTest(unittest.TestCase):
+    # with no deadline the solve isn't skipped for taking too long, it runs until the hit
+    def test_endgame_is_solved_while_pondering(self):
+        state = endgame_state(4)
+        ponderer = Ponderer(state, 3, TranspositionTable(), endgame=EndgameSolver(nodes_per_second=1))
+        action = ponderer.ponder_hit(time.time() + 1000)
+        self.assertIsNotNone(ponderer.context.endgame_result)
+        self.assertEqual(action, ponderer.context.endgame_result.action)
+        self.assertEqual(str(ponderer.context.endgame_result), str(EndgameSolver().solve(endgame_state(4))))
+
+    # a solve too big to finish in time stops at half the time left when the hit comes, like in solve_endgame
+    def test_hit_gives_a_running_solve_a_deadline(self):
+        ponderer = Ponderer(endgame_state(24), 3, TranspositionTable(), endgame=EndgameSolver())
+        start = time.time()
+        action = ponderer.ponder_hit(start + 0.5)
+        self.assertIsNotNone(action)
+        self.assertIsNone(ponderer.context.endgame_result)
+        self.assertLess(time.time() - start, 5)
+
+    def test_stop_ends_the_solve(self):
+        ponderer = Ponderer(endgame_state(24), 3, TranspositionTable(), endgame=EndgameSolver())
+        ponderer.stop()
+        self.assertIsNone(ponderer.action)
+
+
+if __name__ == '__main__':
+    unittest.main()
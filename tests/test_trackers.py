@@ -0,0 +1,164 @@
+# Checks that what GameState keeps up to date on every apply and undo matches what the compute_* methods rebuild
+# from every token, and that the per-size tables of each tracker are shared instead of rebuilt for every state.
+# Run from the project folder: python -m unittest (or python -m pytest)
+import pickle
+import random
+import unittest
+
+from ai.evaluation import get_evaluator_tables
+from ai.frontier import get_frontier_tables
+from ai.gamestate import GameState
+from ai.wins import get_win_tables
+from bitboard import BitBoard
+from players.player import Player
+
+# (width, height) of the boards the games are played on
+SIZES = [(12, 10), (3, 3), (7, 4), (20, 13), (64, 64)]
+SEEDS = range(3)
+STEPS = 60
+
+
+def new_state(width, height):
+    return GameState(BitBoard(width, height), 30, (Player(1, '■'), Player(2, '□')))
+
+
+# Plays a seeded random game with apply and undo, calling check(state) after every change. Now and then a copy of
+# the state, or the state sent through pickle like RootSplitSearch does, is checked too
+def play_random_game(width, height, seed, check):
+    rng = random.Random(seed)
+    state = new_state(width, height)
+    check(state)
+    for step in range(STEPS):
+        p_pos = step % 2
+        if state.game_over() is not None:
+            break
+        actions = state.get_all_possible_actions(p_pos, True)
+        if not actions:
+            break
+        state.apply(rng.choice(actions), p_pos)
+        check(state)
+        if rng.random() < 0.2:
+            state.undo()
+            check(state)
+            state.apply(rng.choice(state.get_all_possible_actions(p_pos, True)), p_pos)
+            check(state)
+        if rng.random() < 0.2:
+            check(state.copy())
+        if rng.random() < 0.1:
+            check(pickle.loads(pickle.dumps(state)))
+    return state
+
+
+# a state a few random actions into a game that isn't over yet
+def state_in_play(seed, width=12, height=10, steps=10):
+    rng = random.Random(seed)
+    state = new_state(width, height)
+    for step in range(steps):
+        state.apply(rng.choice(state.get_all_possible_actions(step % 2, True)), step % 2)
+        if state.game_over() is not None:
+            state.undo()
+            break
+    return state
+
+
+class TrackerTest(unittest.TestCase):
+    def for_every_game(self, check):
+        for width, height in SIZES:
+            for seed in SEEDS:
+                with self.subTest(size=f'{width}x{height}', seed=seed):
+                    play_random_game(width, height, seed, check)
+
+
+class IncrementalEvaluatorTest(TrackerTest):
+    def test_matches_compute_heuristic_score(self):
+        def check(state):
+            self.assertEqual(state.get_heuristic_score(), state.compute_heuristic_score())
+        self.for_every_game(check)
+
+    def test_tables_are_shared(self):
+        state = state_in_play(0)
+        tables = get_evaluator_tables(12, 10)
+        self.assertIs(state.evaluator._tables, tables)
+        self.assertIs(state.copy().evaluator._tables, tables)
+        self.assertIs(state.new_state_from_action(state.get_all_possible_actions(0, True)[0], 0).evaluator._tables,
+                      tables)
+        self.assertIs(pickle.loads(pickle.dumps(state)).evaluator._tables, tables)
+
+    def test_copy_is_independent(self):
+        state = state_in_play(1)
+        score = state.get_heuristic_score()
+        copy = state.copy()
+        for action in copy.get_all_possible_actions(0, True)[:5]:
+            copy.apply(action, 0)
+        self.assertEqual(state.get_heuristic_score(), score)
+        self.assertEqual(state.get_heuristic_score(), state.compute_heuristic_score())
+
+
+class AddFrontierTest(TrackerTest):
+    def test_matches_compute_adds_in_token_diags(self):
+        def check(state):
+            self.assertEqual(set(state.get_adds_in_token_diags_first()), state.compute_adds_in_token_diags())
+            # the frontier is an ordered set, no square comes out twice
+            actions = state.get_adds_in_token_diags_first()
+            self.assertEqual(len(actions), len(set(actions)))
+        self.for_every_game(check)
+
+    def test_tables_are_shared(self):
+        state = state_in_play(0)
+        tables = get_frontier_tables(12, 10)
+        self.assertIs(state.add_frontier._tables, tables)
+        self.assertIs(state.copy().add_frontier._tables, tables)
+        self.assertIs(pickle.loads(pickle.dumps(state)).add_frontier._tables, tables)
+
+    def test_copy_is_independent(self):
+        state = state_in_play(1)
+        actions = state.get_adds_in_token_diags_first()
+        copy = state.copy()
+        for action in copy.get_adds_in_token_diags_first()[:5]:
+            copy.apply(action, 0)
+        self.assertEqual(state.get_adds_in_token_diags_first(), actions)
+
+
+class WinTrackerTest(TrackerTest):
+    def test_matches_compute_game_over(self):
+        def check(state):
+            self.assertEqual(state.game_over(), state.compute_game_over())
+        self.for_every_game(check)
+
+    def test_tables_are_shared(self):
+        state = state_in_play(0)
+        tables = get_win_tables(12, 10)
+        self.assertIs(state.wins._tables, tables)
+        self.assertIs(state.copy().wins._tables, tables)
+        self.assertIs(pickle.loads(pickle.dumps(state)).wins._tables, tables)
+
+    def test_copy_is_independent(self):
+        # an X for player 1 centred on (5, 5), the last of its tokens is added to a copy only
+        state = new_state(12, 10)
+        for x, y in [(4, 6), (6, 6), (4, 4), (6, 4)]:
+            state.apply((x, y, None, None), 0)
+        copy = state.copy()
+        copy.apply((5, 5, None, None), 0)
+        self.assertEqual(copy.game_over(), GameState.MAX_SCORE)
+        self.assertIsNone(state.game_over())
+
+
+class GameOverCacheTest(unittest.TestCase):
+    def test_survives_pickle(self):
+        state = state_in_play(2)
+        # undo leaves game_over to be worked out again
+        state.apply(state.get_all_possible_actions(0, True)[0], 0)
+        state.undo()
+        for cached in (False, True):
+            if cached:
+                state.game_over()
+            copy = pickle.loads(pickle.dumps(state))
+            self.assertEqual(copy.game_over(), state.compute_game_over())
+            self.assertIsNot(copy.game_over(), GameState.NOT_COMPUTED)
+
+    def test_not_computed_pickles_as_itself(self):
+        self.assertIs(pickle.loads(pickle.dumps(GameState.NOT_COMPUTED)), GameState.NOT_COMPUTED)
+
+
+if __name__ == '__main__':
+    unittest.main()
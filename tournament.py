@@ -0,0 +1,169 @@
+# Plays headless ai vs ai games between engine configurations on a pool of processes, then reports the win and draw
+# rates of each configuration, the average think time per move and how many games were played per second.
+# Run from the project folder: python tournament.py [--games N] [--workers N] [--time-budget S] [--width N]
+# [--height N] [configs...]
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from board import Board, BoardSizeError
+from xruddergame import XRudderGame
+
+# name -> settings for an AiPlayer. time_budget of None uses the one given to the tournament, book says if the
+# opening book is used
+ENGINE_CONFIGS = {
+    'depth-1': {'depth': 1, 'time_budget': None, 'book': False},
+    'depth-2': {'depth': 2, 'time_budget': None, 'book': False},
+    'depth-3': {'depth': 3, 'time_budget': None, 'book': False},
+    'default': {'depth': 5, 'time_budget': None, 'book': False},
+    'book': {'depth': 5, 'time_budget': None, 'book': True},
+}
+
+# the engines are deterministic, so every game starts from a few random adds near the centre or they would all be the
+# same. Each opening is played twice, once with each configuration going first
+OPENING_ADDS = 2
+OPENING_RADIUS = 2
+
+
+# the adds of an opening, alternating between the players, from a seed so a game can be replayed
+def random_opening(seed, width=Board.DEFAULT_BOARD_WIDTH, height=Board.DEFAULT_BOARD_HEIGHT):
+    rng = random.Random(seed)
+    cx, cy = (width + 1) // 2, (height + 1) // 2
+    # small boards don't reach the whole radius
+    squares = [(x, y) for x in range(max(cx - OPENING_RADIUS, 1), min(cx + OPENING_RADIUS, width) + 1)
+               for y in range(max(cy - OPENING_RADIUS, 1), min(cy + OPENING_RADIUS, height) + 1)]
+    return rng.sample(squares, 2 * OPENING_ADDS)
+
+
+def configure(player, config, time_budget):
+    settings = ENGINE_CONFIGS[config]
+    player.depth = settings['depth']
+    player.time_budget = settings['time_budget'] if settings['time_budget'] is not None else time_budget
+    if not settings['book']:
+        player.book = None
+
+
+# Plays one game in a worker process. Returns a dict with the configs, the winning player number (None for a draw),
+# the number of turns and each players think time and move count. error is set instead if the game broke
+def play_game(configs, seed, time_budget, width=Board.DEFAULT_BOARD_WIDTH, height=Board.DEFAULT_BOARD_HEIGHT):
+    result = {'configs': configs, 'seed': seed, 'winner': None, 'turns': 0,
+              'think_times': [0.0, 0.0], 'moves': [0, 0], 'error': None}
+    try:
+        game = XRudderGame(board=Board(width, height), render=False)
+        for player, config in zip(game.players, configs):
+            configure(player, config, time_budget)
+
+        for k, (x, y) in enumerate(random_opening(seed, width, height)):
+            game.board.add_token_to_board(game.players[k % 2], x, y)
+
+        game.play()
+    except Exception as err:
+        result['error'] = f'{type(err).__name__}: {err}'
+        return result
+
+    result['winner'] = game.winner
+    result['turns'] = game.turn
+    result['think_times'] = [player.total_think_time for player in game.players]
+    result['moves'] = [player.num_moves for player in game.players]
+    return result
+
+
+# every pair of different configs plays the same openings, each side going first half of the time
+def schedule(configs, games, seed):
+    pairs = [(a, b) for i, a in enumerate(configs) for b in configs[i + 1:]] or [(configs[0], configs[0])]
+    matches = []
+    for k in range(games):
+        a, b = pairs[(k // 2) % len(pairs)]
+        opening_seed = seed + k // 2
+        matches.append(((a, b) if k % 2 == 0 else (b, a), opening_seed))
+    return matches
+
+
+class ConfigStats:
+    def __init__(self):
+        self.games = 0
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+        self.think_time = 0.0
+        self.moves = 0
+
+    def add(self, result, p_pos):
+        self.games += 1
+        if result['winner'] is None:
+            self.draws += 1
+        elif result['winner'] == p_pos + 1:
+            self.wins += 1
+        else:
+            self.losses += 1
+        self.think_time += result['think_times'][p_pos]
+        self.moves += result['moves'][p_pos]
+
+    def rate(self, count):
+        return count / self.games if self.games else 0.0
+
+    @property
+    def time_per_move(self):
+        return self.think_time / self.moves if self.moves else 0.0
+
+
+def run_tournament(configs, games, workers, time_budget, seed=0, width=Board.DEFAULT_BOARD_WIDTH,
+                   height=Board.DEFAULT_BOARD_HEIGHT):
+    stats = {config: ConfigStats() for config in configs}
+    errors = []
+
+    runtime = time.time()
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(play_game, match_configs, match_seed, time_budget, width, height)
+                   for match_configs, match_seed in schedule(configs, games, seed)]
+        for future in as_completed(futures):
+            result = future.result()
+            if result['error'] is not None:
+                errors.append(result)
+                continue
+            for p_pos, config in enumerate(result['configs']):
+                stats[config].add(result, p_pos)
+    runtime = time.time() - runtime
+
+    return stats, errors, runtime
+
+
+def print_report(stats, errors, runtime, games):
+    print(f'{"config":<10} {"games":>6} {"win":>7} {"draw":>7} {"loss":>7} {"s/move":>8}')
+    for config, s in stats.items():
+        print(f'{config:<10} {s.games:>6} {s.rate(s.wins):>7.1%} {s.rate(s.draws):>7.1%} {s.rate(s.losses):>7.1%} '
+              f'{s.time_per_move:>8.3f}')
+    for result in errors:
+        print(f'game {result["configs"]} seed {result["seed"]} failed: {result["error"]}')
+    print(f'{games} games in {runtime:.1f}s, {games / runtime:.2f} games/s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play headless ai vs ai games between engine configurations.')
+    parser.add_argument('configs', nargs='*', help=f'any of {", ".join(ENGINE_CONFIGS)} (default depth-1 depth-2)')
+    parser.add_argument('--games', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--time-budget', type=float, default=0.5, help='seconds per move')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--width', type=int, default=Board.DEFAULT_BOARD_WIDTH)
+    parser.add_argument('--height', type=int, default=Board.DEFAULT_BOARD_HEIGHT)
+    args = parser.parse_args()
+    configs = args.configs or ['depth-1', 'depth-2']
+    for config in configs:
+        if config not in ENGINE_CONFIGS:
+            parser.error(f'unknown config {config}')
+
+    try:
+        Board.check_size(args.width, args.height)
+    except BoardSizeError as err:
+        parser.error(err.get_msg())
+
+    stats, errors, runtime = run_tournament(configs, args.games, args.workers, args.time_budget, args.seed,
+                                            args.width, args.height)
+    print_report(stats, errors, runtime, args.games)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,7 @@
+from board import Board, BoardSizeError
 from xruddergame import XRudderGame
 from players.humanPlayer import HumanPlayer
+from players.aiPlayer import AiPlayer
 
 def main():
     game_types = ['0', '1', '2', '3']
@@ -18,6 +20,24 @@ Choose Game Type:
             print('Invalid input, type [1], [2], or [3]')
             continue
     
+    while True:
+        size = input(f'Choose board size as WIDTHxHEIGHT, from {Board.MIN_BOARD_SIZE}x{Board.MIN_BOARD_SIZE} to '
+                     f'{Board.MAX_BOARD_SIZE}x{Board.MAX_BOARD_SIZE} (empty for default '
+                     f'{Board.DEFAULT_BOARD_WIDTH}x{Board.DEFAULT_BOARD_HEIGHT})\n>')
+        if not size:
+            width, height = Board.DEFAULT_BOARD_WIDTH, Board.DEFAULT_BOARD_HEIGHT
+            break
+        try:
+            width, height = (int(n) for n in size.lower().split('x'))
+            Board.check_size(width, height)
+        except ValueError:
+            print('Invalid input, type the width and height like 12x10')
+            continue
+        except BoardSizeError as err:
+            print(err.get_msg())
+            continue
+        break
+
     while True:
         symbol_p1 = input('Choose Player 1 symbol (must be 1 char or empty for default)\n>')
         if len(symbol_p1) > 1:
@@ -44,7 +64,12 @@ Choose Game Type:
     else:
         ps = None
 
-    game = XRudderGame(players=ps)
+    game = XRudderGame(board=Board(width, height), players=ps)
+    # against a human the ai can search while they type their move
+    if game_type in ['2', '3']:
+        for player in game.players:
+            if isinstance(player, AiPlayer):
+                player.ponder = True
     game.play()
 
 
@@ -47,13 +47,18 @@ def print_skip_turn(err, player):
 class XRudderGame:
     DEFAULT_STARTING_MOVES_LEFT = 30
 
-    def __init__(self, board=Board(), players=None, starting_moves_left=DEFAULT_STARTING_MOVES_LEFT):
-        self._board = board
+    # with render off nothing is printed, for running ai vs ai games in scripts
+    def __init__(self, board=None, players=None, starting_moves_left=DEFAULT_STARTING_MOVES_LEFT, render=True):
+        # a new board for every game, a default argument would be shared by all of them
+        self._board = board if board is not None else Board()
         self._turn = 0
         self._moves_left = starting_moves_left
         self._is_complete = False
         self._prev_move_text = ''
-                
+        self._render = render
+        # number of the winning player, None while playing or after a draw
+        self._winner = None
+
         if players is not None:
             if isinstance(players[0], str):
                 self._players = [AiPlayer(1, players[0], self), players[1]]
@@ -64,9 +69,6 @@ class XRudderGame:
         else:
             self._players = [AiPlayer(1, '■', self), AiPlayer(2, '□', self)]
 
-
-
-
     @property
     def moves_left(self):
         return self._moves_left
@@ -79,6 +81,22 @@ class XRudderGame:
     def board(self):
         return self._board
 
+    @property
+    def render(self):
+        return self._render
+
+    @property
+    def turn(self):
+        return self._turn
+
+    @property
+    def is_complete(self):
+        return self._is_complete
+
+    @property
+    def winner(self):
+        return self._winner
+
     def print_current_state(self, player):
         print('')
         self.print_game_board()
@@ -110,13 +128,13 @@ class XRudderGame:
 
     # True if all players have no tokens to add or moves left to move their tokens
     def all_players_cannot_do_anything(self):
-        if self._board.is_full():
+        if self._board.is_full() or self._board.has_no_open_space():
             return True
         return all(not player.has_tokens() for player in self._players) and self.no_moves_left()
 
     # gets players input and updates board accordingly
     def play_turn(self, player):
-        if not player.has_tokens() and self.no_moves_left():
+        if (not player.has_tokens() and self.no_moves_left()) or self._board.has_no_open_space():
             raise PlayerOutOfMovesAndTokensError
 
         x1, y1, x2, y2 = player.get_coordinates()
@@ -136,24 +154,38 @@ class XRudderGame:
 
     # The MAIN game loop, pulls everything together to allow players to play the game
     def play(self):
-        print_welcome_banner()
-        
+        try:
+            self._play_turns()
+        finally:
+            # also when the game stops on an error, so nothing a player started keeps running
+            for player in self._players:
+                player.game_ended()
+
+    def _play_turns(self):
+        if self._render:
+            print_welcome_banner()
+
         while not self._is_complete:
             self._turn += 1
 
             for player in self._players:
                 successful_input = False
                 while not successful_input:
-                    self.print_current_state(player)
+                    if self._render:
+                        self.print_current_state(player)
 
                     # issues can occur base on players input so handle and describe those cases to the players
                     try:
                         self.play_turn(player)
                     # if players is out of options, we have to skip them so they are not stuck doing the impossible
                     except PlayerOutOfMovesAndTokensError as no_options_err:
-                        print_skip_turn(no_options_err, player)
+                        if self._render:
+                            print_skip_turn(no_options_err, player)
                     # for other errors, players gets to try again
                     except Error as err:
+                        # nobody is watching to fix it, and an ai would just make the same move again
+                        if not self._render:
+                            raise
                         print_error(err)
                         continue
 
@@ -163,15 +195,18 @@ class XRudderGame:
                 potential_winners_set = self._board.check_if_someone_won()
                 if bool(potential_winners_set):
                     if player.number in potential_winners_set:
-                        self.print_winner(player)
+                        winner = player
                     else:
                         winner = self._players[potential_winners_set.pop() - 1]
+                    self._winner = winner.number
+                    if self._render:
                         self.print_winner(winner)
                     self._is_complete = True
                     break
 
             # if no one can do anything, end game as draw
             if self.all_players_cannot_do_anything():
-                self.print_draw()
+                if self._render:
+                    self.print_draw()
                 self._is_complete = True
                 break
@@ -0,0 +1,55 @@
+import random
+
+# fixed seed so every process (and anything saved to disk by key) agrees on the same keys
+ZOBRIST_SEED = 40028071
+
+# keys for every board size that has been used, shared by all boards of that size
+_KEYS_BY_SIZE = {}
+
+
+# Random 64 bit keys that are xor'd together to give each position an (almost) unique hash.
+# Cell keys are indexed the same way as the numpy board: board[x - 1][y - 1]
+class ZobristKeys:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+        rng = random.Random(f'{ZOBRIST_SEED}:{width}x{height}')
+        # index 0 is unused so a players number can index its own keys
+        self.cells = [None] + [[rng.getrandbits(64) for _ in range(width * height)] for _ in (1, 2)]
+        self._counters = {}
+
+    def cell(self, num, x, y):
+        return self.cells[num][(x - 1) * self.height + (y - 1)]
+
+    # key for a counter like moves left or a players tokens left, made on first use so there is no limit
+    def counter(self, name, value):
+        key = self._counters.get((name, value))
+        if key is None:
+            key = random.Random(f'{ZOBRIST_SEED}:{name}:{value}').getrandbits(64)
+            self._counters[(name, value)] = key
+        return key
+
+    def moves_left(self, moves_left):
+        return self.counter('moves_left', moves_left)
+
+    def tokens_left(self, num, tokens_left):
+        return self.counter('tokens_left', (num, tokens_left))
+
+    def side_to_move(self, num):
+        return self.counter('side_to_move', num)
+
+    def ai(self, num):
+        return self.counter('ai', num)
+
+    # pickled as just the board size, the keys are the same in every process since they come from the seed
+    def __reduce__(self):
+        return get_zobrist_keys, (self.width, self.height)
+
+
+def get_zobrist_keys(width, height):
+    keys = _KEYS_BY_SIZE.get((width, height))
+    if keys is None:
+        keys = ZobristKeys(width, height)
+        _KEYS_BY_SIZE[(width, height)] = keys
+    return keys